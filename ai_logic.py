@@ -1,35 +1,578 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+
 import streamlit as st
 import requests
+import aiohttp
+from requests.adapters import HTTPAdapter
 from gtts import gTTS
 import io
 
+from cache import DiskStore, MemoryLRU, StoreBlobs, content_key, make_response_cache
+from question_dedup import DUPLICATE_THRESHOLD, QuestionIndex, topic_digest
+from storage import past_questions
+import question_bank
+from text_profile import build_profile
+import metrics
+from metrics import fit_budget
+from shared_state import get_store
+
+
+def _setting(name: str, default=None):
+    """
+    Read a setting from the environment first, then from secrets.toml.
+    """
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        # No secrets.toml (e.g. running outside `streamlit run`)
+        return default
+
+
 # -------------------------------------
 # Read Gemini API key from secrets.toml
 # -------------------------------------
 
-GEMINI_API_KEY = st.secrets.get("GEMINI_API_KEY", "")
+GEMINI_API_KEY = _setting("GEMINI_API_KEY", "")
 
 if not GEMINI_API_KEY:
     st.error("GEMINI_API_KEY is missing in .streamlit/secrets.toml")
 
-# ✅ Updated model + updated endpoint
-GEMINI_MODEL = "gemini-2.5-flash"
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+# ✅ Updated model + updated endpoint (base URL can point at a local fake server)
+GEMINI_MODEL = _setting("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_BASE_URL = _setting(
+    "GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta"
+).rstrip("/")
+GEMINI_URL = f"{GEMINI_BASE_URL}/models/{GEMINI_MODEL}:generateContent"
+GEMINI_STREAM_URL = f"{GEMINI_BASE_URL}/models/{GEMINI_MODEL}:streamGenerateContent"
+
+# HTTP client tuning (override in secrets.toml or the environment)
+GEMINI_POOL_SIZE = int(_setting("GEMINI_POOL_SIZE", 10))
+GEMINI_CONNECT_TIMEOUT = float(_setting("GEMINI_CONNECT_TIMEOUT", 5))
+GEMINI_READ_TIMEOUT = float(_setting("GEMINI_READ_TIMEOUT", 60))
+
+# Retries, circuit breaker and concurrency limit for Gemini requests
+GEMINI_MAX_RETRIES = int(_setting("GEMINI_MAX_RETRIES", 3))
+GEMINI_BACKOFF_BASE = float(_setting("GEMINI_BACKOFF_BASE", 0.5))
+GEMINI_BACKOFF_MAX = float(_setting("GEMINI_BACKOFF_MAX", 8))
+GEMINI_RETRY_AFTER_MAX = float(_setting("GEMINI_RETRY_AFTER_MAX", 30))
+GEMINI_BREAKER_THRESHOLD = int(_setting("GEMINI_BREAKER_THRESHOLD", 5))
+GEMINI_BREAKER_RESET = float(_setting("GEMINI_BREAKER_RESET", 30))
+GEMINI_MAX_CONCURRENCY = int(_setting("GEMINI_MAX_CONCURRENCY", 8))
+
+# Client-side rate limit shared by all sessions (0 disables it). It, the
+# concurrency limit and the circuit breaker are per process: with N app/API
+# workers on one API key, set GEMINI_RATE_PER_MINUTE to the quota / N
+GEMINI_RATE_PER_MINUTE = float(_setting("GEMINI_RATE_PER_MINUTE", 60))
+GEMINI_BURST = int(_setting("GEMINI_BURST", 10))
+GEMINI_QUEUE_MAX = int(_setting("GEMINI_QUEUE_MAX", 50))
+GEMINI_QUEUE_TIMEOUT = float(_setting("GEMINI_QUEUE_TIMEOUT", 60))
+
+# Near-duplicate questions: similarity threshold, regenerations, digest size
+DEDUP_THRESHOLD = float(_setting("DEDUP_THRESHOLD", DUPLICATE_THRESHOLD))
+DEDUP_MAX_RETRIES = int(_setting("DEDUP_MAX_RETRIES", 1))
+DEDUP_DIGEST_TOPICS = int(_setting("DEDUP_DIGEST_TOPICS", 12))
+DEDUP_HISTORY_QUESTIONS = int(_setting("DEDUP_HISTORY_QUESTIONS", 200))
+
+# Local question bank: serve from it first, refill it in the background
+QUESTION_BANK_ENABLED = str(_setting("QUESTION_BANK_ENABLED", "true")).lower() in ("1", "true", "yes")
+QUESTION_BANK_MIN = int(_setting("QUESTION_BANK_MIN", 5))
+QUESTION_BANK_BATCH = int(_setting("QUESTION_BANK_BATCH", 8))
+# Seconds before a key is refilled again after a refill that banked nothing
+QUESTION_BANK_COOLDOWN = float(_setting("QUESTION_BANK_COOLDOWN", 300))
+
+# Prompt budgets (estimated tokens) per section; oversized parts are cut
+BUDGET_RESUME_TOKENS = int(_setting("BUDGET_RESUME_TOKENS", 400))
+BUDGET_JOB_TOKENS = int(_setting("BUDGET_JOB_TOKENS", 400))
+BUDGET_HISTORY_TOKENS = int(_setting("BUDGET_HISTORY_TOKENS", 150))
+BUDGET_ANSWER_TOKENS = int(_setting("BUDGET_ANSWER_TOKENS", 1200))
+BUDGET_SESSION_TOKENS = int(_setting("BUDGET_SESSION_TOKENS", 6000))
+
+# How many missing per-answer feedbacks are generated at once at summary time
+SUMMARY_FEEDBACK_PARALLELISM = int(_setting("SUMMARY_FEEDBACK_PARALLELISM", 4))
+# Seconds the summary waits for unfinished running notes before it falls
+# back to summarizing the whole session
+RUNNING_SUMMARY_WAIT = float(_setting("RUNNING_SUMMARY_WAIT", 2))
 
+# Worker threads for background work (prefetching questions etc.)
+BACKGROUND_WORKERS = int(_setting("BACKGROUND_WORKERS", 4))
 
-def _call_gemini(prompt: str) -> str:
+# Question audio cache: in-memory LRU in front of a folder of MP3 files
+TTS_CACHE_MAX_BYTES = int(_setting("TTS_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+TTS_CACHE_DIR = Path(_setting("TTS_CACHE_DIR", ".tts_cache"))
+# Second level behind the memory LRU: "disk" (TTS_CACHE_DIR) or "shared"
+TTS_CACHE_BACKEND = _setting("TTS_CACHE_BACKEND", "disk")
+TTS_CACHE_TTL = float(_setting("TTS_CACHE_TTL", 7 * 24 * 3600))
+
+# Optional HTTP endpoint used instead of gTTS (e.g. the local fake server);
+# it receives {"text", "lang"} as JSON and returns MP3 bytes
+TTS_BACKEND_URL = _setting("TTS_BACKEND_URL", "")
+
+# State shared by several workers: "", sqlite:///path or redis://host:port/db
+# (see shared_state.py); used by the "shared" cache backends below
+SHARED_STATE_URL = _setting("SHARED_STATE_URL", "")
+# History (HISTORY_FILE / HISTORY_DB) and the question bank are files on the
+# local disk. With a store for several hosts (redis://) set this once they are
+# on storage every host shares, otherwise each host would keep its own history
+HISTORY_SHARED = str(_setting("HISTORY_SHARED", "false")).lower() in ("1", "true", "yes")
+
+# Cache of Gemini replies keyed by prompt hash: "memory", "disk", "shared" or "none"
+RESPONSE_CACHE_BACKEND = _setting("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(_setting("RESPONSE_CACHE_TTL", 3600))
+RESPONSE_CACHE_MAX_ENTRIES = int(_setting("RESPONSE_CACHE_MAX_ENTRIES", 512))
+RESPONSE_CACHE_DIR = Path(_setting("RESPONSE_CACHE_DIR", ".response_cache"))
+
+
+# ---------- HTTP client ----------
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+
+def _get_http_session() -> requests.Session:
     """
-    Call Gemini API using updated model (2.5 flash).
+    Shared keep-alive session for every Gemini call in this process.
+
+    Streamlit keeps imported modules alive between reruns, so all reruns and
+    all browser sessions reuse the same pooled connections instead of paying
+    a new TCP+TLS handshake per call.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=GEMINI_POOL_SIZE,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update(
+                    {
+                        "Content-Type": "application/json",
+                        "x-goog-api-key": GEMINI_API_KEY,
+                    }
+                )
+                _http_session = session
+    return _http_session
+
+
+# ---------- Retries and circuit breaker ----------
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Process-wide request counters
+GEMINI_STATS = {
+    "requests": 0,
+    "retries": 0,
+    "failures": 0,
+    "breaker_trips": 0,
+    "breaker_rejections": 0,
+    "in_flight": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str, delta: int = 1) -> None:
+    with _stats_lock:
+        GEMINI_STATS[name] += delta
+
+
+class GeminiUnavailable(RuntimeError):
+    """Raised without calling Gemini while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `threshold` consecutive failures; after `reset_after`
+    seconds one trial request is let through (half-open) to probe recovery.
+    A probe that never reports back is replaced after another `reset_after`.
+    """
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if (
+                self.state == "open" and now - self._opened_at >= self.reset_after
+            ) or (
+                self.state == "half-open" and now - self._probe_started >= self.reset_after
+            ):
+                self.state = "half-open"
+                self._probe_started = now
+                return True
+            # open, or half-open with the trial request still in flight
+            return False
+
+    def rejecting(self) -> bool:
+        """
+        Whether allow() would refuse right now. Claims no probe, so requests
+        can check it before waiting for a rate-limit token.
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            started = self._opened_at if self.state == "open" else self._probe_started
+            return time.monotonic() - started < self.reset_after
+
+    def abandon_probe(self) -> None:
+        """
+        The request ended without an answer from Gemini (cancelled, local
+        error): let the next request probe instead.
+        """
+        with self._lock:
+            if self.state == "half-open":
+                self.state = "open"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == "half-open" or self._failures >= self.threshold:
+                if self.state != "open":
+                    _count("breaker_trips")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+# ---------- Rate limiting ----------
+
+# Lower number = served first when requests are queued
+PRIORITY_INTERACTIVE = 0  # the candidate is waiting (feedback, next question)
+PRIORITY_PREFETCH = 1     # speculative background work
+PRIORITY_SUMMARY = 2      # end-of-session summaries
+
+
+class GeminiOverloaded(RuntimeError):
+    """Raised when the request queue is full or the wait times out."""
+
+
+class RequestScheduler:
+    """
+    Token bucket in front of Gemini, shared by every session in the process.
+
+    Requests wait in a priority queue (then FIFO) for a token. When the queue
+    is full, a new request evicts the newest queued request of a strictly
+    lower priority, otherwise it is rejected right away.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_queue: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(burst, 1)
+        self.max_queue = max_queue
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._queue = []  # heap of [priority, seq, ticket]
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {
+            "admitted": 0,
+            "rejected": 0,
+            "evicted": 0,
+            "timeouts": 0,
+            "wait_total": 0.0,
+            "wait_max": 0.0,
+            "depth_max": 0,
+        }
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _admitted(self, waited: float) -> None:
+        self._tokens -= 1
+        self._stats["admitted"] += 1
+        self._stats["wait_total"] += waited
+        self._stats["wait_max"] = max(self._stats["wait_max"], waited)
+
+    def acquire(self, priority: int, timeout: float) -> None:
+        if self.rate <= 0:
+            return
+
+        start = time.monotonic()
+        with self._cond:
+            self._refill()
+            if not self._queue and self._tokens >= 1:
+                self._admitted(0.0)
+                return
+
+            if len(self._queue) >= self.max_queue:
+                worst = max(self._queue, key=lambda e: (e[0], e[1]), default=None)
+                if worst is None or worst[0] <= priority:
+                    self._stats["rejected"] += 1
+                    raise GeminiOverloaded("Too many Gemini requests queued, try again shortly")
+                worst[2]["evicted"] = True
+                self._queue.remove(worst)
+                heapq.heapify(self._queue)
+                self._stats["evicted"] += 1
+
+            ticket = {"evicted": False}
+            entry = [priority, next(self._seq), ticket]
+            heapq.heappush(self._queue, entry)
+            self._stats["depth_max"] = max(self._stats["depth_max"], len(self._queue))
+            self._cond.notify_all()
+
+            deadline = start + timeout
+            while True:
+                if ticket["evicted"]:
+                    self._stats["rejected"] += 1
+                    raise GeminiOverloaded("Request dropped for higher-priority Gemini work")
+
+                self._refill()
+                if self._queue[0] is entry and self._tokens >= 1:
+                    heapq.heappop(self._queue)
+                    self._admitted(time.monotonic() - start)
+                    self._cond.notify_all()
+                    return
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(entry)
+                    heapq.heapify(self._queue)
+                    self._stats["timeouts"] += 1
+                    self._cond.notify_all()
+                    raise GeminiOverloaded("Timed out waiting for a Gemini request slot")
+
+                if self._queue[0] is entry:
+                    # Sleep until the next token is due
+                    remaining = min(remaining, (1 - self._tokens) / self.rate)
+                self._cond.wait(remaining)
+
+    def stats(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["depth"] = len(self._queue)
+        waited = stats["admitted"] or 1
+        stats["wait_avg"] = stats["wait_total"] / waited
+        return stats
+
+
+_breaker = CircuitBreaker(GEMINI_BREAKER_THRESHOLD, GEMINI_BREAKER_RESET)
+_limiter = threading.BoundedSemaphore(GEMINI_MAX_CONCURRENCY)
+_scheduler = RequestScheduler(GEMINI_RATE_PER_MINUTE, GEMINI_BURST, GEMINI_QUEUE_MAX)
+
+
+def scheduler_stats() -> dict:
+    """
+    Queue depth, wait times and admission counters of the rate limiter.
+    """
+    return _scheduler.stats()
+
+
+def gemini_stats() -> dict:
+    """
+    Request/retry/breaker counters for this process.
+    """
+    with _stats_lock:
+        stats = dict(GEMINI_STATS)
+    stats["breaker_state"] = _breaker.state
+    return stats
+
+
+def _retry_after(headers) -> float:
+    """
+    Seconds from a Retry-After header (delta or HTTP date), or None.
+    """
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), GEMINI_RETRY_AFTER_MAX)
+
+
+def _backoff(attempt: int) -> float:
+    # "Full jitter": uniform in [0, min(max, base * 2^attempt)]
+    return random.uniform(0, min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt))
+
+
+def _check_breaker(claim: bool = True) -> None:
+    """
+    Raise GeminiUnavailable while the circuit is open. With claim=False no
+    half-open probe is started: used to fail fast before queueing for a token.
+    """
+    allowed = _breaker.allow() if claim else not _breaker.rejecting()
+    if not allowed:
+        _count("breaker_rejections")
+        raise GeminiUnavailable("Gemini is unavailable right now (circuit open)")
+
+
+def _failed_attempt(attempt: int, status, text: str, headers, error) -> float:
+    """
+    Book-keeping for a failed attempt (status None = connection error).
+
+    Raises if the error is not retryable or retries are used up, otherwise
+    returns how long to sleep before the next attempt.
+    """
+    if status is not None and status not in RETRYABLE_STATUS:
+        # The request itself is wrong; Gemini is not down
+        _breaker.record_success()
+        _count("failures")
+        raise RuntimeError(f"Gemini HTTP {status}: {text}")
+
+    _breaker.record_failure()
+    if attempt == GEMINI_MAX_RETRIES:
+        _count("failures")
+        if error is not None:
+            raise RuntimeError(f"Gemini request failed: {error}")
+        raise RuntimeError(f"Gemini HTTP {status}: {text}")
+
+    _count("retries")
+    delay = _retry_after(headers)
+    return _backoff(attempt) if delay is None else delay
+
+
+def _post_gemini(
+    url: str,
+    body: dict,
+    stream: bool = False,
+    priority: int = PRIORITY_INTERACTIVE,
+    **kwargs,
+):
+    """
+    POST to Gemini with bounded retries, backoff and the circuit breaker.
+
+    Retries connection errors and 429/5xx, honoring Retry-After. Each attempt
+    takes a rate-limit token at the given priority and holds one concurrency
+    slot. With stream=True the slot is still held when the response is
+    returned; the caller must close it and call _limiter.release().
     """
     if not GEMINI_API_KEY:
         raise RuntimeError("Missing GEMINI_API_KEY in secrets")
 
-    headers = {
-        "Content-Type": "application/json",
-    }
-    params = {
-        "key": GEMINI_API_KEY
-    }
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        # Fail fast while the circuit is open, but only claim the half-open
+        # probe after the token wait, by a request that is actually sent
+        _check_breaker(claim=False)
+        _scheduler.acquire(priority, GEMINI_QUEUE_TIMEOUT)
+        _limiter.acquire()
+        try:
+            _check_breaker()
+        except GeminiUnavailable:
+            _limiter.release()
+            raise
+        _count("in_flight")
+        _count("requests")
+        resp = None
+        error = None
+        try:
+            resp = _get_http_session().post(
+                url,
+                json=body,
+                timeout=(GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT),
+                stream=stream,
+                **kwargs,
+            )
+            if resp.status_code == 200 and not stream:
+                resp.content  # read the body before giving the slot back
+        except requests.RequestException as e:
+            if resp is not None:
+                resp.close()
+                resp = None
+            error = e
+        except BaseException:
+            _count("in_flight", -1)
+            _limiter.release()
+            _breaker.abandon_probe()
+            raise
+
+        if resp is not None and resp.status_code == 200:
+            _breaker.record_success()
+            _count("in_flight", -1)
+            if not stream:
+                _limiter.release()
+            return resp
+
+        _count("in_flight", -1)
+        _limiter.release()
+
+        if resp is None:
+            delay = _failed_attempt(attempt, None, "", None, error)
+        else:
+            try:
+                delay = _failed_attempt(
+                    attempt, resp.status_code, resp.text, resp.headers, None
+                )
+            finally:
+                resp.close()
+        time.sleep(delay)
+
+
+# ---------- Shared state ----------
+
+if getattr(get_store(SHARED_STATE_URL), "multi_host", False) and not HISTORY_SHARED:
+    raise ValueError(
+        "SHARED_STATE_URL is shared by several hosts, but the interview history is "
+        "kept per host; put HISTORY_DB / HISTORY_FILE on shared storage and set "
+        "HISTORY_SHARED=1, or use a sqlite:/// store on one host"
+    )
+
+
+# ---------- Response cache ----------
+
+_response_cache = make_response_cache(
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_DIR,
+    get_store(SHARED_STATE_URL),
+)
+
+
+def set_response_cache(cache) -> None:
+    """
+    Swap the response cache backend (see cache.py), or None to disable it.
+    """
+    global _response_cache
+    _response_cache = cache
+
+
+def response_cache_stats() -> dict:
+    """
+    Hit/miss counters of the response cache.
+    """
+    if _response_cache is None:
+        return {"hits": 0, "misses": 0}
+    return _response_cache.stats()
+
+
+def _response_key(prompt: str, json_mode: bool) -> str:
+    return content_key(GEMINI_MODEL, "json" if json_mode else "text", prompt)
+
+
+def _request_body(prompt: str, json_mode: bool = False) -> dict:
     data = {
         "contents": [
             {
@@ -39,44 +582,213 @@ def _call_gemini(prompt: str) -> str:
             }
         ]
     }
+    if json_mode:
+        data["generationConfig"] = {"responseMimeType": "application/json"}
+    return data
 
-    resp = requests.post(GEMINI_URL, headers=headers, params=params, json=data)
 
-    if resp.status_code != 200:
-        raise RuntimeError(f"Gemini HTTP {resp.status_code}: {resp.text}")
-
-    payload = resp.json()
+def _response_text(payload: dict) -> str:
     try:
         return payload["candidates"][0]["content"]["parts"][0]["text"]
     except Exception as e:
         raise RuntimeError(f"Unexpected Gemini response format: {e}\n{payload}")
 
 
-# ---------- Question generation ----------
+def _call_gemini(
+    prompt: str,
+    json_mode: bool = False,
+    use_cache: bool = False,
+    priority: int = PRIORITY_INTERACTIVE,
+    kind: str = "other",
+) -> str:
+    """
+    Call Gemini API using updated model (2.5 flash).
 
-def generate_question(
-    interview_type,
-    role,
-    level,
-    resume_text="",
-    job_text="",
-    previous_questions=None,
+    With json_mode=True Gemini is asked for an application/json response.
+    With use_cache=True an identical earlier prompt is answered from the
+    response cache. Every call is recorded in metrics under `kind`.
+    """
+    start = time.monotonic()
+    cache = _response_cache if use_cache else None
+    if cache is not None:
+        cached = cache.get(_response_key(prompt, json_mode))
+        if cached is not None:
+            metrics.record_call(kind, prompt, cached, time.monotonic() - start, "cached")
+            return cached
+
+    try:
+        resp = _post_gemini(GEMINI_URL, _request_body(prompt, json_mode), priority=priority)
+        payload = resp.json()
+        text = _response_text(payload)
+    except Exception:
+        metrics.record_call(kind, prompt, "", time.monotonic() - start, "error")
+        raise
+
+    metrics.record_call(
+        kind, prompt, text, time.monotonic() - start, "ok", payload.get("usageMetadata")
+    )
+    if cache is not None:
+        cache.put(_response_key(prompt, json_mode), text, RESPONSE_CACHE_TTL)
+    return text
+
+
+def _stream_gemini(
+    prompt: str,
+    use_cache: bool = False,
+    priority: int = PRIORITY_INTERACTIVE,
+    kind: str = "other",
 ):
     """
-    Generate a new interview question with Gemini 2.5 flash.
+    Stream a Gemini reply as text chunks via streamGenerateContent (SSE).
+
+    With use_cache=True a cached reply is yielded as one chunk, and a fully
+    received reply is stored for next time.
     """
-    if previous_questions is None:
-        previous_questions = []
+    start = time.monotonic()
+    cache = _response_cache if use_cache else None
+    if cache is not None:
+        cached = cache.get(_response_key(prompt, False))
+        if cached is not None:
+            metrics.record_call(kind, prompt, cached, time.monotonic() - start, "cached")
+            yield cached
+            return
+
+    chunks = []
+    usage = None
+    status = "error"
+    try:
+        resp = _post_gemini(
+            GEMINI_STREAM_URL,
+            _request_body(prompt),
+            stream=True,
+            priority=priority,
+            params={"alt": "sse"},
+        )
+        try:
+            # SSE is always UTF-8: split raw bytes into lines, then decode. Letting
+            # requests decode would guess ISO-8859-1 and str.splitlines would
+            # also break lines on U+0085 inside the text
+            for raw in resp.iter_lines():
+                line = raw.decode("utf-8")
+                if not line.startswith("data:"):
+                    continue
+                payload = json.loads(line[len("data:"):])
+                # The last chunk carries the token counts for the whole reply
+                usage = payload.get("usageMetadata", usage)
+                try:
+                    parts = payload["candidates"][0]["content"]["parts"]
+                except (KeyError, IndexError):
+                    continue
+                for part in parts:
+                    if part.get("text"):
+                        chunks.append(part["text"])
+                        yield part["text"]
+            status = "ok"
+        finally:
+            resp.close()
+            _limiter.release()
+    finally:
+        metrics.record_call(
+            kind, prompt, "".join(chunks), time.monotonic() - start, status, usage
+        )
+
+    if cache is not None and chunks:
+        cache.put(_response_key(prompt, False), "".join(chunks), RESPONSE_CACHE_TTL)
+
+
+def _stream_with_fallback(
+    prompt: str,
+    what: str,
+    fallback: str,
+    use_cache: bool = False,
+    priority: int = PRIORITY_INTERACTIVE,
+    kind: str = "other",
+):
+    """
+    Yield streamed chunks; on error show it and yield the fallback text.
+    """
+    sent_any = False
+    try:
+        for chunk in _stream_gemini(prompt, use_cache=use_cache, priority=priority, kind=kind):
+            sent_any = True
+            yield chunk
+    except Exception as e:
+        st.error(f"Error generating {what} from Gemini: {e}")
+        if sent_any:
+            yield "\n\n_(The response was interrupted.)_"
+        else:
+            yield fallback
+
+
+# ---------- Background work ----------
+
+_executor = ThreadPoolExecutor(
+    max_workers=BACKGROUND_WORKERS,
+    thread_name_prefix="ai-logic",
+)
+
+# Process-wide prefetch counters (shared by every Streamlit session)
+PREFETCH_STATS = {"hits": 0, "misses": 0, "cancelled": 0}
+_prefetch_stats_lock = threading.Lock()
+
+
+def submit_background(fn, *args, **kwargs) -> Future:
+    """
+    Run fn(*args, **kwargs) on the shared worker pool.
+    """
+    return _executor.submit(fn, *args, **kwargs)
+
+
+def record_prefetch(outcome: str) -> None:
+    """
+    Count one prefetch outcome: "hits", "misses" or "cancelled".
+    """
+    with _prefetch_stats_lock:
+        PREFETCH_STATS[outcome] += 1
+
+
+def prefetch_hit_rate() -> float:
+    """
+    Share of "Next question" clicks served by a prefetched question.
+    """
+    with _prefetch_stats_lock:
+        used = PREFETCH_STATS["hits"] + PREFETCH_STATS["misses"]
+        return PREFETCH_STATS["hits"] / used if used else 0.0
+
+
+# ---------- Question generation ----------
+
+QUESTION_FALLBACK = "Can you tell me about a recent challenge you faced and how you handled it?"
+
+
+def _resume_section(resume_text) -> str:
+    return fit_budget(build_profile(resume_text, "resume"), BUDGET_RESUME_TOKENS, "resume")
+
+
+def _job_section(job_text) -> str:
+    return fit_budget(
+        build_profile(job_text, "job description"), BUDGET_JOB_TOKENS, "job description"
+    )
 
+
+def _question_prompt(
+    interview_type, role, level, resume_text, job_text, covered_topics, avoid=""
+) -> str:
     previous_block = ""
-    if previous_questions:
-        joined = "\n".join(f"- {q}" for q in previous_questions)
+    if covered_topics:
+        covered_topics = fit_budget(covered_topics, BUDGET_HISTORY_TOKENS, "topics")
         previous_block = (
-            "These questions were already asked. Do NOT repeat any of them:\n"
-            f"{joined}\n"
+            "Topics already covered. Ask about something different:\n"
+            f"{covered_topics}\n"
         )
+    if avoid:
+        previous_block += f"Do NOT ask anything like: {avoid}\n"
 
-    prompt = f"""
+    # Compact cached profiles instead of the raw pasted text
+    resume_text = _resume_section(resume_text)
+    job_text = _job_section(job_text)
+
+    return f"""
 You are an AI interview system. Generate ONE new interview question.
 
 INTERVIEW TYPE: {interview_type}
@@ -97,23 +809,302 @@ Rules:
 - No extra text
 """
 
+
+def _asked_questions(role, previous_questions) -> list:
+    """
+    This session's questions plus recent ones from saved history for the role.
+    """
+    asked = list(previous_questions or [])
     try:
-        text = _call_gemini(prompt).strip()
+        asked += past_questions(role, DEDUP_HISTORY_QUESTIONS)
+    except Exception:
+        pass
+    return asked
+
+
+def _generate_distinct(ask, asked):
+    """
+    Shared body of (a)generate_question: ask(covered, avoid) until the reply
+    is not a near-duplicate of an asked question. Returns None if it still
+    is once retries run out.
+
+    `ask` returns either text or an awaitable; this is a generator so both
+    the sync and async callers can drive it.
+    """
+    index = QuestionIndex(asked)
+    covered = topic_digest(asked, DEDUP_DIGEST_TOPICS)
+
+    avoid = ""
+    for _ in range(DEDUP_MAX_RETRIES + 1):
+        text = (yield ask(covered, avoid)).strip()
         if not text:
-            return "Can you tell me about a recent challenge you faced and how you handled it?"
-        return text
+            return QUESTION_FALLBACK
+        closest, similarity = index.closest(text)
+        if similarity < DEDUP_THRESHOLD:
+            return text
+        avoid = closest
+    return None
+
+
+# ---------- Question bank ----------
+
+question_bank.duplicate_threshold = DEDUP_THRESHOLD
+
+_replenishing = set()
+# key -> monotonic time before which the key is not refilled again
+_replenish_cooldown = {}
+_replenish_lock = threading.Lock()
+
+
+def _bank_eligible(resume_text, job_text) -> bool:
+    # Questions tailored to a resume or job description are not reusable
+    return QUESTION_BANK_ENABLED and not (resume_text or "").strip() and not (job_text or "").strip()
+
+
+def replenish_question_bank(interview_type, role, level):
+    """
+    Bulk-generate questions for this key on the worker pool and bank them.
+
+    Returns the Future, or None if a refill for the key is already running
+    or the last one banked nothing less than QUESTION_BANK_COOLDOWN ago.
+    """
+    key = question_bank.bank_key(interview_type, role, level)
+    with _replenish_lock:
+        if key in _replenishing or time.monotonic() < _replenish_cooldown.get(key, 0):
+            return None
+        _replenishing.add(key)
+
+    def _refill():
+        added = 0
+        try:
+            # Bank whatever survives dedup, even if short of a full batch
+            plan = generate_question_plan(
+                interview_type, role, level, QUESTION_BANK_BATCH,
+                priority=PRIORITY_PREFETCH, partial=True,
+            )
+            if plan:
+                added = question_bank.add_questions(
+                    interview_type, role, level, plan, "generated"
+                )
+        finally:
+            with _replenish_lock:
+                _replenishing.discard(key)
+                if added:
+                    _replenish_cooldown.pop(key, None)
+                else:
+                    # Failed or all duplicates: don't retry on every question
+                    _replenish_cooldown[key] = time.monotonic() + QUESTION_BANK_COOLDOWN
+
+    return submit_background(_refill)
+
+
+def _question_from_bank(interview_type, role, level, previous_questions):
+    """
+    Serve a banked question not asked in this session; top the bank up when low.
+
+    Questions the candidate saw in earlier sessions (saved history for the
+    role) are only served once no fresh ones are left, and do not count as
+    available, so the bank is refilled before it gets there.
+    """
+    exclude = list(previous_questions or [])
+    try:
+        seen = past_questions(role, DEDUP_HISTORY_QUESTIONS)
+    except Exception:
+        seen = []
+    try:
+        q = question_bank.take_question(
+            interview_type, role, level, exclude=exclude, avoid=seen
+        )
+        if question_bank.available(interview_type, role, level, exclude=exclude + seen) <= QUESTION_BANK_MIN:
+            replenish_question_bank(interview_type, role, level)
+    except Exception:
+        return None
+    return q
+
+
+def _bank_generated(interview_type, role, level, question) -> None:
+    try:
+        question_bank.add_questions(interview_type, role, level, [question], "generated")
+    except Exception:
+        pass
+
+
+def _question_when_offline(interview_type, role, level, previous_questions) -> str:
+    """
+    Gemini failed or kept repeating itself: any banked question not asked in
+    this session, else the canned fallback.
+    """
+    try:
+        q = question_bank.take_question(
+            interview_type, role, level, exclude=previous_questions or []
+        )
+    except Exception:
+        q = None
+    return q or QUESTION_FALLBACK
+
+
+def generate_question(
+    interview_type,
+    role,
+    level,
+    resume_text="",
+    job_text="",
+    previous_questions=None,
+    use_cache=False,
+    priority=PRIORITY_INTERACTIVE,
+):
+    """
+    Generate a new interview question with Gemini 2.5 flash.
+
+    Non-personalized questions are served from the local question bank first.
+    Only a short digest of earlier topics goes into the prompt; near-duplicates
+    of this session's or saved questions for the role are rejected locally.
+    """
+    bankable = _bank_eligible(resume_text, job_text)
+    if bankable:
+        q = _question_from_bank(interview_type, role, level, previous_questions)
+        if q:
+            return q
+
+    asked = _asked_questions(role, previous_questions)
+
+    def ask(covered, avoid):
+        prompt = _question_prompt(
+            interview_type, role, level, resume_text, job_text, covered, avoid
+        )
+        return _call_gemini(prompt, use_cache=use_cache, priority=priority, kind="question")
+
+    steps = _generate_distinct(ask, asked)
+    try:
+        reply = next(steps)
+        while True:
+            reply = steps.send(reply)
+    except StopIteration as done:
+        q = done.value
     except Exception as e:
         st.error(f"Error generating question from Gemini: {e}")
-        return "Can you tell me about a recent challenge you faced and how you handled it?"
+        return _question_when_offline(interview_type, role, level, previous_questions)
+    if q is None:
+        # Only near-duplicates came back: a banked or canned question instead
+        return _question_when_offline(interview_type, role, level, previous_questions)
 
+    if bankable and q != QUESTION_FALLBACK:
+        _bank_generated(interview_type, role, level, q)
+    return q
 
-# ---------- Feedback ----------
 
-def get_feedback(question: str, answer: str) -> str:
+# ---------- Question plan ----------
+
+def _parse_question_list(text: str) -> list:
     """
-    Give structured feedback with Gemini 2.5 flash.
+    Pull a list of question strings out of a (hopefully) JSON reply.
+    """
+    text = text.strip()
+    # Tolerate ```json fences around the payload
+    fenced = re.search(r"```(?:json)?\s*(.*?)```", text, re.DOTALL)
+    if fenced:
+        text = fenced.group(1).strip()
+
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("questions", [])
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON list of questions")
+
+    questions = []
+    seen = set()
+    for item in data:
+        if isinstance(item, dict):
+            item = item.get("question", "")
+        if not isinstance(item, str):
+            continue
+        q = item.strip()
+        if q and q.lower() not in seen:
+            seen.add(q.lower())
+            questions.append(q)
+    return questions
+
+
+def generate_question_plan(
+    interview_type,
+    role,
+    level,
+    count,
+    resume_text="",
+    job_text="",
+    use_cache=False,
+    priority=PRIORITY_INTERACTIVE,
+    partial=False,
+):
+    """
+    Generate the whole question set in one Gemini call.
+
+    Returns a list of `count` distinct questions, or None if the reply could
+    not be parsed so the caller can fall back to generate_question().
+    A couple of spare questions are requested so near-duplicates of saved
+    questions for the role can be dropped locally. With partial=True fewer
+    than `count` survivors are returned as they are (bank refills).
     """
+    asked = _asked_questions(role, [])
+    covered = topic_digest(asked, DEDUP_DIGEST_TOPICS)
+    covered = fit_budget(covered, BUDGET_HISTORY_TOKENS, "topics")
+    covered_block = (
+        f"Topics this candidate already practiced. Avoid them:\n{covered}\n"
+        if covered else ""
+    )
+    wanted = count + 2
+    resume_text = _resume_section(resume_text)
+    job_text = _job_section(job_text)
+
     prompt = f"""
+You are an AI interview system. Generate {wanted} distinct interview questions
+for one interview, in the order they should be asked.
+
+INTERVIEW TYPE: {interview_type}
+ROLE: {role}
+LEVEL: {level}
+
+{covered_block}
+Resume:
+{resume_text}
+
+Job description:
+{job_text}
+
+Rules:
+- Exactly {wanted} questions, no two about the same topic
+- No numbers
+- Reply with JSON only: {{"questions": ["...", "..."]}}
+"""
+
+    try:
+        reply = _call_gemini(
+            prompt, json_mode=True, use_cache=use_cache, priority=priority, kind="plan"
+        )
+        questions = _parse_question_list(reply)
+    except Exception:
+        return None
+
+    index = QuestionIndex(asked)
+    distinct = []
+    for q in questions:
+        if not index.is_duplicate(q, DEDUP_THRESHOLD):
+            distinct.append(q)
+            index.add(q)
+
+    if len(distinct) < count and not partial:
+        return None
+    return distinct[:count]
+
+
+# ---------- Feedback ----------
+
+FEEDBACK_FALLBACK = "Sorry, I could not generate feedback right now. Please try again."
+
+
+def _feedback_prompt(question: str, answer: str) -> str:
+    answer = fit_budget(answer, BUDGET_ANSWER_TOKENS, "answer")
+    return f"""
 You are an experienced interviewer.
 
 Question: {question}
@@ -126,27 +1117,48 @@ Give:
 4. How to rewrite it better
 """
 
+
+def get_feedback(question: str, answer: str, use_cache: bool = True) -> str:
+    """
+    Give structured feedback with Gemini 2.5 flash.
+    """
     try:
-        return _call_gemini(prompt).strip()
+        prompt = _feedback_prompt(question, answer)
+        return _call_gemini(prompt, use_cache=use_cache, kind="feedback").strip()
     except Exception as e:
         st.error(f"Error generating feedback from Gemini: {e}")
-        return "Sorry, I could not generate feedback right now. Please try again."
+        return FEEDBACK_FALLBACK
 
 
-# ---------- Summary ----------
-
-def summarize_session(role: str, interview_type: str, qa_list: list) -> str:
+def stream_feedback(question: str, answer: str, use_cache: bool = True):
     """
-    Full interview summary.
+    Same as get_feedback, but yields text chunks as Gemini produces them.
     """
+    return _stream_with_fallback(
+        _feedback_prompt(question, answer),
+        "feedback",
+        FEEDBACK_FALLBACK,
+        use_cache,
+        kind="feedback",
+    )
+
+
+# ---------- Summary ----------
+
+SUMMARY_FALLBACK = "Sorry, I could not generate a summary right now. Please try again."
+
+
+def _summary_prompt(role: str, interview_type: str, qa_list: list) -> str:
+    # Split the session budget evenly so one long answer can't crowd out others
+    per_item = BUDGET_SESSION_TOKENS // max(len(qa_list), 1)
     qa_text = ""
     for i, item in enumerate(qa_list, start=1):
         q = item.get("question", "")
-        a = item.get("answer", "")
-        f = item.get("feedback", "")
+        a = fit_budget(item.get("answer", ""), per_item // 2, "answer")
+        f = fit_budget(item.get("feedback", ""), per_item // 2, "feedback")
         qa_text += f"\nQuestion {i}:\n{q}\nAnswer:\n{a}\nFeedback:\n{f}\n"
 
-    prompt = f"""
+    return f"""
 ROLE: {role}
 INTERVIEW TYPE: {interview_type}
 
@@ -160,28 +1172,574 @@ Make a summary with:
 - 3 action items for this week
 """
 
+
+def summarize_session(
+    role: str,
+    interview_type: str,
+    qa_list: list,
+    use_cache: bool = True,
+    priority: int = PRIORITY_SUMMARY,
+) -> str:
+    """
+    Full interview summary.
+    """
     try:
-        return _call_gemini(prompt).strip()
+        prompt = _summary_prompt(role, interview_type, qa_list)
+        return _call_gemini(prompt, use_cache=use_cache, priority=priority, kind="summary").strip()
     except Exception as e:
         st.error(f"Error generating summary from Gemini: {e}")
-        return "Sorry, I could not generate a summary right now. Please try again."
+        return SUMMARY_FALLBACK
+
+
+def stream_summary(
+    role: str,
+    interview_type: str,
+    qa_list: list,
+    use_cache: bool = True,
+    priority: int = PRIORITY_SUMMARY,
+):
+    """
+    Same as summarize_session, but yields text chunks as Gemini produces them.
+    """
+    return _stream_with_fallback(
+        _summary_prompt(role, interview_type, qa_list),
+        "summary",
+        SUMMARY_FALLBACK,
+        use_cache,
+        priority,
+        kind="summary",
+    )
+
+
+# ---------- Rolling summary ----------
+
+def _running_summary_prompt(role, interview_type, running_summary, index, item) -> str:
+    feedback = item.get("feedback", "")
+    feedback_block = f"Feedback given:\n{feedback}\n" if feedback else ""
+    return f"""
+You keep compact running notes on a mock interview.
+
+ROLE: {role}
+INTERVIEW TYPE: {interview_type}
+
+Notes so far:
+{running_summary or "(none yet)"}
+
+New answer (question {index}):
+Question: {item.get("question", "")}
+Answer: {item.get("answer", "")}
+{feedback_block}
+Update the notes with this answer. Keep at most 150 words:
+- one line per question with a score 1-10 and the key point
+- running strengths and improvements
+Reply with the updated notes only.
+"""
+
+
+def update_running_summary(role, interview_type, running_summary, index, item):
+    """
+    Fold one answered question into the running notes.
+
+    Returns the new notes, or None if Gemini could not be reached.
+    """
+    prompt = _running_summary_prompt(role, interview_type, running_summary, index, item)
+    try:
+        return _call_gemini(
+            prompt, use_cache=True, priority=PRIORITY_SUMMARY, kind="running_summary"
+        ).strip()
+    except Exception:
+        return None
+
+
+def fold_running_summary(previous: Future, role, interview_type, index, item) -> dict:
+    """
+    Background step of the rolling summary, run once `previous` is done.
+
+    Returns {"text": notes or None, "count": answers folded in}. Once a step
+    fails the chain stays failed so callers fall back to the full summary.
+    """
+    running = previous.result() if previous is not None else {"text": "", "count": 0}
+    if running["text"] is None:
+        return {"text": None, "count": running["count"]}
+    text = update_running_summary(role, interview_type, running["text"], index, item)
+    return {"text": text, "count": running["count"] + 1}
+
+
+def chain_running_summary(previous: Future, role, interview_type, index, item) -> Future:
+    """
+    Queue fold_running_summary for `item` behind `previous` (None for the
+    first answer) and return a Future for its result.
+
+    The step is only submitted from previous's done-callback, so no worker
+    thread sits blocked on an earlier step while answers arrive faster
+    than Gemini folds them.
+    """
+    outer = Future()
+
+    def _link(step: Future) -> None:
+        try:
+            outer.set_result(step.result())
+        except BaseException as e:
+            outer.set_exception(e)
+
+    def _start(done: Future) -> None:
+        try:
+            step = submit_background(
+                fold_running_summary, done, role, interview_type, index, item
+            )
+        except Exception as e:
+            # Pool shut down
+            outer.set_exception(e)
+            return
+        step.add_done_callback(_link)
+
+    if previous is None:
+        _start(None)
+    else:
+        previous.add_done_callback(_start)
+    return outer
+
+
+def _final_summary_prompt(role, interview_type, running_summary, count) -> str:
+    return f"""
+ROLE: {role}
+INTERVIEW TYPE: {interview_type}
+
+Running notes on all {count} answers of this interview:
+{running_summary}
+
+Make a summary with:
+- Overall score
+- Top 3 strengths
+- Top 3 improvements
+- 3 action items for this week
+"""
+
+
+def stream_final_summary(role, interview_type, running_summary, count):
+    """
+    Final summary from the running notes: a small prompt, so it is fast.
+    """
+    return _stream_with_fallback(
+        _final_summary_prompt(role, interview_type, running_summary, count),
+        "summary",
+        SUMMARY_FALLBACK,
+        True,
+        PRIORITY_SUMMARY,
+        kind="final_summary",
+    )
+
+
+# ---------- Async client ----------
+#
+# One event loop on a daemon thread with one pooled aiohttp session. The
+# sync bridge (run_sync / gather_sync) lets Streamlit code run several
+# independent calls at once, so a click costs the slowest call, not the sum.
+
+class _AsyncRunner:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._session = None
+        thread = threading.Thread(
+            target=self.loop.run_forever, name="ai-logic-async", daemon=True
+        )
+        thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def session(self) -> aiohttp.ClientSession:
+        # Only ever called on self.loop, so no lock is needed
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=GEMINI_POOL_SIZE),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=GEMINI_CONNECT_TIMEOUT,
+                    sock_read=GEMINI_READ_TIMEOUT,
+                ),
+                headers={
+                    "Content-Type": "application/json",
+                    "x-goog-api-key": GEMINI_API_KEY,
+                },
+            )
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def _get_runner() -> _AsyncRunner:
+    global _runner
+    if _runner is None:
+        with _runner_lock:
+            if _runner is None:
+                _runner = _AsyncRunner()
+    return _runner
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on the shared event loop and wait for its result.
+    """
+    return _get_runner().run(coro)
+
+
+def close_async_client() -> None:
+    """
+    Close the pooled aiohttp session; call before a script exits.
+    """
+    if _runner is not None:
+        _runner.run(_runner.close())
+
+
+def gather_sync(*coros, return_exceptions=False):
+    """
+    Run several coroutines concurrently and return their results in order.
+    """
+    async def _gather():
+        return await asyncio.gather(*coros, return_exceptions=return_exceptions)
+
+    return run_sync(_gather())
+
+
+async def _aacquire_slot() -> None:
+    """
+    Take a concurrency slot without blocking the event loop.
+
+    If the waiting task is cancelled, the worker thread still gets the slot
+    later, so it is handed back as soon as that happens.
+    """
+    if _limiter.acquire(blocking=False):
+        return
+    waiter = asyncio.ensure_future(asyncio.to_thread(_limiter.acquire))
+    try:
+        await asyncio.shield(waiter)
+    except asyncio.CancelledError:
+        waiter.add_done_callback(
+            lambda f: _limiter.release() if not f.cancelled() and f.exception() is None else None
+        )
+        raise
+
+
+async def _apost_gemini(url: str, body: dict, priority: int) -> dict:
+    """
+    Async twin of _post_gemini; shares its breaker, rate limiter and slots.
+    """
+    if not GEMINI_API_KEY:
+        raise RuntimeError("Missing GEMINI_API_KEY in secrets")
+
+    session = await _get_runner().session()
+    for attempt in range(GEMINI_MAX_RETRIES + 1):
+        # Breaker precheck, tokens, then the probe claim (see _post_gemini)
+        _check_breaker(claim=False)
+        await asyncio.to_thread(_scheduler.acquire, priority, GEMINI_QUEUE_TIMEOUT)
+        await _aacquire_slot()
+        try:
+            _check_breaker()
+        except GeminiUnavailable:
+            _limiter.release()
+            raise
+        _count("in_flight")
+        _count("requests")
+        status = None
+        text = ""
+        headers = None
+        error = None
+        try:
+            async with session.post(url, json=body) as resp:
+                status = resp.status
+                headers = resp.headers
+                text = await resp.text()
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+        except BaseException:
+            # Cancelled (or a local error): nothing was learned about Gemini
+            _breaker.abandon_probe()
+            raise
+        finally:
+            _count("in_flight", -1)
+            _limiter.release()
+
+        if status == 200:
+            _breaker.record_success()
+            return json.loads(text)
+
+        await asyncio.sleep(_failed_attempt(attempt, status, text, headers, error))
+
+
+async def _acall_gemini(
+    prompt: str,
+    json_mode: bool = False,
+    use_cache: bool = False,
+    priority: int = PRIORITY_INTERACTIVE,
+    kind: str = "other",
+) -> str:
+    start = time.monotonic()
+    cache = _response_cache if use_cache else None
+    if cache is not None:
+        cached = cache.get(_response_key(prompt, json_mode))
+        if cached is not None:
+            metrics.record_call(kind, prompt, cached, time.monotonic() - start, "cached")
+            return cached
+
+    try:
+        payload = await _apost_gemini(GEMINI_URL, _request_body(prompt, json_mode), priority)
+        text = _response_text(payload)
+    except Exception:
+        metrics.record_call(kind, prompt, "", time.monotonic() - start, "error")
+        raise
+
+    metrics.record_call(
+        kind, prompt, text, time.monotonic() - start, "ok", payload.get("usageMetadata")
+    )
+    if cache is not None:
+        cache.put(_response_key(prompt, json_mode), text, RESPONSE_CACHE_TTL)
+    return text
+
+
+async def agenerate_question(
+    interview_type,
+    role,
+    level,
+    resume_text="",
+    job_text="",
+    previous_questions=None,
+    use_cache=False,
+    priority=PRIORITY_INTERACTIVE,
+):
+    """
+    Async version of generate_question.
+    """
+    bankable = _bank_eligible(resume_text, job_text)
+    if bankable:
+        q = _question_from_bank(interview_type, role, level, previous_questions)
+        if q:
+            return q
+
+    asked = _asked_questions(role, previous_questions)
+
+    def ask(covered, avoid):
+        prompt = _question_prompt(
+            interview_type, role, level, resume_text, job_text, covered, avoid
+        )
+        return _acall_gemini(prompt, use_cache=use_cache, priority=priority, kind="question")
+
+    steps = _generate_distinct(ask, asked)
+    try:
+        pending = next(steps)
+        while True:
+            pending = steps.send(await pending)
+    except StopIteration as done:
+        q = done.value
+    except Exception as e:
+        st.error(f"Error generating question from Gemini: {e}")
+        return _question_when_offline(interview_type, role, level, previous_questions)
+    if q is None:
+        # Only near-duplicates came back: a banked or canned question instead
+        return _question_when_offline(interview_type, role, level, previous_questions)
+
+    if bankable and q != QUESTION_FALLBACK:
+        _bank_generated(interview_type, role, level, q)
+    return q
+
+
+async def aget_feedback(
+    question: str,
+    answer: str,
+    use_cache: bool = True,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> str:
+    """
+    Async version of get_feedback.
+    """
+    try:
+        prompt = _feedback_prompt(question, answer)
+        reply = await _acall_gemini(
+            prompt, use_cache=use_cache, priority=priority, kind="feedback"
+        )
+        return reply.strip()
+    except Exception as e:
+        st.error(f"Error generating feedback from Gemini: {e}")
+        return FEEDBACK_FALLBACK
+
+
+async def asummarize_session(
+    role: str,
+    interview_type: str,
+    qa_list: list,
+    use_cache: bool = True,
+    priority: int = PRIORITY_SUMMARY,
+) -> str:
+    """
+    Async version of summarize_session.
+    """
+    try:
+        prompt = _summary_prompt(role, interview_type, qa_list)
+        reply = await _acall_gemini(
+            prompt, use_cache=use_cache, priority=priority, kind="summary"
+        )
+        return reply.strip()
+    except Exception as e:
+        st.error(f"Error generating summary from Gemini: {e}")
+        return SUMMARY_FALLBACK
+
+
+async def afill_missing_feedback(qa_list: list, max_parallel: int = None) -> list:
+    """
+    Return a copy of qa_list where every answer without feedback gets one.
+
+    Missing feedback is generated concurrently, at most max_parallel at once.
+    Items whose feedback could not be generated keep an empty feedback.
+    """
+    if max_parallel is None:
+        max_parallel = SUMMARY_FEEDBACK_PARALLELISM
+    semaphore = asyncio.Semaphore(max(max_parallel, 1))
+
+    async def _fill(item: dict) -> dict:
+        if item.get("feedback") or not item.get("answer", "").strip():
+            return item
+        async with semaphore:
+            feedback = await aget_feedback(
+                item.get("question", ""), item["answer"], priority=PRIORITY_SUMMARY
+            )
+        if feedback == FEEDBACK_FALLBACK:
+            return item
+        return {**item, "feedback": feedback}
+
+    return list(await asyncio.gather(*(_fill(item) for item in qa_list)))
+
+
+def fill_missing_feedback(qa_list: list, max_parallel: int = None) -> list:
+    """
+    Sync bridge for afill_missing_feedback.
+    """
+    if all(item.get("feedback") for item in qa_list):
+        return list(qa_list)
+    return run_sync(afill_missing_feedback(qa_list, max_parallel))
 
 
 # ---------- TTS ----------
 
-def question_to_audio_bytes(question: str):
+_tts_memory = MemoryLRU(TTS_CACHE_MAX_BYTES)
+if TTS_CACHE_BACKEND == "shared":
+    if not SHARED_STATE_URL:
+        raise ValueError('TTS_CACHE_BACKEND is "shared" but SHARED_STATE_URL is not set')
+    # Audio synthesized by one worker is reused by all of them
+    _tts_disk = StoreBlobs(get_store(SHARED_STATE_URL), "tts:", TTS_CACHE_TTL)
+else:
+    _tts_disk = DiskStore(TTS_CACHE_DIR, suffix=".mp3")
+
+# Synthesis jobs in flight, so the same question is only synthesized once
+_tts_pending = {}
+_tts_lock = threading.Lock()
+_tts_synthesized = 0
+
+
+def tts_cache_stats() -> dict:
+    """
+    Hit/miss counters and memory footprint of the question audio cache.
+    """
+    memory = _tts_memory.stats()
+    disk = _tts_disk.stats()
+    return {
+        "memory_hits": memory["hits"],
+        "disk_hits": disk["hits"],
+        "misses": _tts_synthesized,
+        "entries": memory["entries"],
+        "bytes": memory["bytes"],
+    }
+
+
+def cached_audio_bytes(question: str, lang: str = "en"):
+    """
+    Return cached MP3 bytes for the question, or None without synthesizing.
+    """
+    if not question:
+        return None
+
+    key = content_key(lang, question)
+    audio = _tts_memory.get(key)
+    if audio is not None:
+        return audio
+
+    audio = _tts_disk.get(key)
+    if audio is not None:
+        _tts_memory.put(key, audio)
+    return audio
+
+
+def _synthesize(text: str, lang: str) -> bytes:
+    if TTS_BACKEND_URL:
+        resp = _get_http_session().post(
+            TTS_BACKEND_URL,
+            json={"text": text, "lang": lang},
+            # Don't send the Gemini key to a third-party endpoint
+            headers={"x-goog-api-key": None},
+            timeout=(GEMINI_CONNECT_TIMEOUT, GEMINI_READ_TIMEOUT),
+        )
+        resp.raise_for_status()
+        return resp.content
+
+    tts = gTTS(text=text, lang=lang)
+    buf = io.BytesIO()
+    tts.write_to_fp(buf)
+    buf.seek(0)
+    return buf.read()
+
+
+def question_to_audio_bytes(question: str, lang: str = "en"):
     """
     Convert question text to MP3 using gTTS.
+
+    Results are cached by hash of (text, lang) in memory and on disk, so
+    reruns of the same question don't hit the network again.
     """
+    global _tts_synthesized
     if not question:
         return None
 
+    audio = cached_audio_bytes(question, lang)
+    if audio is not None:
+        return audio
+
     try:
-        tts = gTTS(text=question, lang="en")
-        buf = io.BytesIO()
-        tts.write_to_fp(buf)
-        buf.seek(0)
-        return buf.read()
+        audio = _synthesize(question, lang)
     except Exception as e:
         st.warning(f"Could not generate audio for the question: {e}")
-        return None
\ No newline at end of file
+        return None
+
+    key = content_key(lang, question)
+    _tts_memory.put(key, audio)
+    _tts_disk.put(key, audio)
+    with _tts_lock:
+        _tts_synthesized += 1
+    return audio
+
+
+def prefetch_audio(question: str, lang: str = "en") -> Future:
+    """
+    Synthesize question audio on the worker pool.
+
+    Returns a Future with the MP3 bytes (or None). Concurrent requests for the
+    same text share one synthesis job.
+    """
+    key = content_key(lang, question)
+    with _tts_lock:
+        future = _tts_pending.get(key)
+        if future is not None:
+            return future
+        future = submit_background(question_to_audio_bytes, question, lang)
+        _tts_pending[key] = future
+
+    def _done(_):
+        with _tts_lock:
+            _tts_pending.pop(key, None)
+
+    future.add_done_callback(_done)
+    return future
@@ -0,0 +1,480 @@
+"""
+HTTP/JSON API over the interview engine, as an alternative to `streamlit run`.
+
+    python api_server.py --port 8080
+    python api_server.py --fake      # against a local fake Gemini + TTS server
+
+Endpoints:
+    POST /sessions                      start an interview (JSON settings)
+    GET  /sessions/{id}                 current state
+    POST /sessions/{id}/feedback        {"answer"}; ?stream=1 for chunked text
+    POST /sessions/{id}/next            {"answer"} -> next question or summary stage
+    POST /sessions/{id}/summary         {"save": bool}; ?stream=1 for chunked text
+    GET  /sessions/{id}/audio           MP3 of the current question
+    DELETE /sessions/{id}
+    GET  /history                       ?role=&interview_type=&level=&page=&page_size=
+    GET  /history/{id}
+    GET  /metrics                       Prometheus text format
+    GET  /healthz
+
+Engine calls block on Gemini, so they run on a thread pool; the event loop
+only does I/O. With SHARED_STATE_URL set, interviews live in the shared store
+and several server processes can run behind a load balancer without sticky
+sessions; each process rate-limits Gemini on its own, so give each one its
+share of the quota (see shared_state.py). ai_logic reads its settings on
+import, so the project modules are imported lazily (after --fake has pointed
+them at the fake server).
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from aiohttp import web
+
+from shared_state import SessionStore, get_store
+
+API_WORKERS = int(os.environ.get("API_WORKERS", 32))
+# Sessions idle for longer than this are dropped
+API_SESSION_TTL = float(os.environ.get("API_SESSION_TTL", 2 * 3600))
+API_MAX_SESSIONS = int(os.environ.get("API_MAX_SESSIONS", 10000))
+
+SETTINGS_FIELDS = {
+    "role": str,
+    "interview_type": str,
+    "level": str,
+    "total_questions": int,
+    "resume_text": str,
+    "job_text": str,
+    "mode": str,
+    "plan_mode": bool,
+    "incremental_summary": bool,
+}
+_JSON_TYPES = {str: "a string", int: "an integer", bool: "true or false"}
+# Allowed values, matching the choices offered by the Streamlit app
+SETTINGS_CHOICES = {
+    "interview_type": ("Behavioral", "Professional", "Resume-based"),
+    "level": ("beginner", "intermediate", "advanced"),
+    "mode": ("Quick drill", "Standard mock", "Deep session"),
+}
+
+
+class _Entry:
+    def __init__(self, session, version: int = 0):
+        self.session = session
+        self.version = version
+        # One request at a time per interview (within this worker)
+        self.lock = asyncio.Lock()
+        self.touched = time.monotonic()
+
+
+def _not_found() -> web.HTTPNotFound:
+    return web.HTTPNotFound(text=_json_text({"error": "unknown session"}),
+                            content_type="application/json")
+
+
+class SessionRegistry:
+    """
+    In-progress interviews by id.
+
+    With a SessionStore (SHARED_STATE_URL) every change is written through,
+    so any worker behind the load balancer can serve the next request; the
+    local entry is only a cache that is refreshed when another worker has
+    saved a newer version.
+    """
+
+    def __init__(self, shared: Optional[SessionStore] = None):
+        self.shared = shared
+        self._entries: Dict[str, _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def add(self, session) -> str:
+        session_id = uuid.uuid4().hex
+        self._entries[session_id] = _Entry(session)
+        await self.save(session_id)
+        return session_id
+
+    async def get(self, session_id: str) -> _Entry:
+        entry = self._entries.get(session_id)
+        if self.shared is not None:
+            loaded = await asyncio.to_thread(self.shared.load, session_id)
+            if loaded is None:
+                self._drop(session_id)
+                raise _not_found()
+            version, data = loaded
+            if entry is None or entry.version != version:
+                from interview_engine import InterviewSession
+
+                session = InterviewSession.from_dict(data)
+                if entry is None:
+                    entry = self._entries[session_id] = _Entry(session, version)
+                else:
+                    entry.session.cancel_prefetch()
+                    entry.session, entry.version = session, version
+        if entry is None:
+            raise _not_found()
+        entry.touched = time.monotonic()
+        return entry
+
+    async def save(self, session_id: str) -> None:
+        """Write the interview through to the shared store (if any)."""
+        entry = self._entries.get(session_id)
+        if entry is None or self.shared is None:
+            return
+        entry.version += 1
+        await asyncio.to_thread(
+            self.shared.save, session_id, entry.version, entry.session.to_dict()
+        )
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            entry.session.cancel_prefetch()
+
+    async def remove(self, session_id: str) -> None:
+        self._drop(session_id)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.delete, session_id)
+
+    def expire(self, ttl: float) -> int:
+        """
+        Forget idle local entries; shared copies expire by their own TTL.
+        """
+        cutoff = time.monotonic() - ttl
+        stale = [
+            sid for sid, e in self._entries.items()
+            if e.touched < cutoff and not e.lock.locked()
+        ]
+        for sid in stale:
+            self._drop(sid)
+        return len(stale)
+
+
+def _json_text(data: Any) -> str:
+    return json.dumps(data)
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({"error": message}, status=status)
+
+
+def _state(session_id: str, session) -> Dict[str, Any]:
+    return {
+        "id": session_id,
+        "stage": session.stage,
+        "index": session.current_index,
+        "total": session.total_questions,
+        "question": session.current_question,
+        "feedback": session.current_feedback,
+        "answered": len(session.qa_list),
+        "summary": session.overall_summary,
+        "saved": session.saved,
+        "error": session.error,
+    }
+
+
+async def _read_json(request: web.Request) -> Dict[str, Any]:
+    if not request.can_read_body:
+        return {}
+    try:
+        data = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text=_json_text({"error": "invalid JSON"}),
+                                 content_type="application/json")
+    if not isinstance(data, dict):
+        raise web.HTTPBadRequest(text=_json_text({"error": "expected a JSON object"}),
+                                 content_type="application/json")
+    return data
+
+
+async def _blocking(request: web.Request, fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(request.app["pool"], fn, *args)
+
+
+async def _stream_text(request: web.Request, chunks) -> web.StreamResponse:
+    """Send a blocking chunk generator as chunked text/plain."""
+    response = web.StreamResponse(headers={"Content-Type": "text/plain; charset=utf-8"})
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+    while True:
+        chunk = await _blocking(request, next, chunks, None)
+        if chunk is None:
+            break
+        await response.write(chunk.encode("utf-8"))
+    await response.write_eof()
+    return response
+
+
+# ---------- Interview endpoints ----------
+
+async def start_session(request: web.Request) -> web.Response:
+    from interview_engine import InterviewSession
+
+    registry: SessionRegistry = request.app["sessions"]
+    if len(registry) >= API_MAX_SESSIONS:
+        return _error(503, "too many open sessions")
+
+    data = await _read_json(request)
+    settings = {}
+    for name, kind in SETTINGS_FIELDS.items():
+        if name not in data:
+            continue
+        value = data[name]
+        # JSON types must match exactly: no "false" strings, no true as 1
+        if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+            return _error(400, f"{name} must be {_JSON_TYPES[kind]}")
+        choices = SETTINGS_CHOICES.get(name)
+        if choices and value not in choices:
+            return _error(400, f"{name} must be one of: {', '.join(choices)}")
+        settings[name] = value
+    if not 1 <= settings.get("total_questions", 3) <= 10:
+        return _error(400, "total_questions must be between 1 and 10")
+
+    session = InterviewSession(**settings)
+    try:
+        await _blocking(request, session.start)
+    except ValueError as e:
+        return _error(400, str(e))
+    if session.error:
+        session.cancel_prefetch()
+        return _error(502, session.error)
+
+    session_id = await registry.add(session)
+    return web.json_response(_state(session_id, session), status=201)
+
+
+async def get_state(request: web.Request) -> web.Response:
+    session_id = request.match_info["id"]
+    entry = await request.app["sessions"].get(session_id)
+    return web.json_response(_state(session_id, entry.session))
+
+
+async def feedback(request: web.Request) -> web.StreamResponse:
+    from interview_engine import STAGE_INTERVIEW
+
+    session_id = request.match_info["id"]
+    entry = await request.app["sessions"].get(session_id)
+    data = await _read_json(request)
+
+    async with entry.lock:
+        session = entry.session
+        if session.stage != STAGE_INTERVIEW:
+            return _error(409, f"session is in stage {session.stage}")
+        if "answer" in data:
+            session.current_answer = str(data["answer"])
+        if not session.current_answer.strip():
+            return _error(400, "answer is empty")
+
+        chunks = session.feedback_stream()
+        if request.query.get("stream"):
+            response = await _stream_text(request, chunks)
+        else:
+            await _blocking(request, list, chunks)
+            response = web.json_response(_state(session_id, session))
+        await request.app["sessions"].save(session_id)
+        return response
+
+
+async def next_question(request: web.Request) -> web.Response:
+    from interview_engine import STAGE_INTERVIEW
+
+    session_id = request.match_info["id"]
+    entry = await request.app["sessions"].get(session_id)
+    data = await _read_json(request)
+
+    async with entry.lock:
+        session = entry.session
+        if session.stage != STAGE_INTERVIEW:
+            return _error(409, f"session is in stage {session.stage}")
+        if "answer" in data:
+            answer = str(data["answer"])
+            if answer != session.current_answer:
+                # Feedback was for a different answer
+                session.current_feedback = ""
+            session.current_answer = answer
+
+        await _blocking(request, session.next_question)
+        await request.app["sessions"].save(session_id)
+        if session.error:
+            return _error(502, session.error)
+        return web.json_response(_state(session_id, session))
+
+
+async def summary(request: web.Request) -> web.StreamResponse:
+    from interview_engine import STAGE_SUMMARY
+
+    session_id = request.match_info["id"]
+    entry = await request.app["sessions"].get(session_id)
+    data = await _read_json(request)
+
+    async with entry.lock:
+        session = entry.session
+        if session.stage != STAGE_SUMMARY:
+            return _error(409, f"session is in stage {session.stage}")
+        if not session.qa_list:
+            return _error(409, "no answers to summarize")
+
+        response = None
+        if not session.overall_summary:
+            if request.query.get("stream"):
+                chunks, _ = await _blocking(request, session.summary_stream)
+                response = await _stream_text(request, chunks)
+            else:
+                await _blocking(request, session.summarize)
+            await request.app["sessions"].save(session_id)
+
+        if data.get("save") and not session.saved:
+            await _blocking(request, session.save)
+            await request.app["sessions"].save(session_id)
+        return response or web.json_response(_state(session_id, session))
+
+
+async def question_audio(request: web.Request) -> web.Response:
+    from ai_logic import cached_audio_bytes, prefetch_audio
+
+    entry = await request.app["sessions"].get(request.match_info["id"])
+    question = entry.session.current_question
+    if not question:
+        return _error(404, "no current question")
+
+    audio = cached_audio_bytes(question)
+    if audio is None:
+        audio = await asyncio.wrap_future(prefetch_audio(question))
+    if not audio:
+        return _error(502, "audio is not available for this question")
+    return web.Response(body=audio, content_type="audio/mpeg")
+
+
+async def delete_session(request: web.Request) -> web.Response:
+    await request.app["sessions"].remove(request.match_info["id"])
+    return web.Response(status=204)
+
+
+# ---------- History and ops ----------
+
+async def history(request: web.Request) -> web.Response:
+    from storage import query_sessions
+
+    query = request.query
+    try:
+        page = max(int(query.get("page", 1)), 1)
+        page_size = min(max(int(query.get("page_size", 20)), 1), 100)
+    except ValueError:
+        return _error(400, "page and page_size must be integers")
+
+    headers, total = await _blocking(
+        request,
+        lambda: query_sessions(
+            role=query.get("role") or None,
+            interview_type=query.get("interview_type") or None,
+            level=query.get("level") or None,
+            page=page,
+            page_size=page_size,
+        ),
+    )
+    return web.json_response({"sessions": headers, "total": total, "page": page})
+
+
+async def history_session(request: web.Request) -> web.Response:
+    from storage import get_session
+
+    try:
+        session_id = int(request.match_info["id"])
+    except ValueError:
+        return _error(400, "invalid id")
+    session = await _blocking(request, get_session, session_id)
+    if session is None:
+        return _error(404, "unknown session")
+    return web.json_response(session)
+
+
+async def metrics_endpoint(request: web.Request) -> web.Response:
+    import metrics
+
+    return web.Response(
+        text=metrics.export_prometheus(),
+        content_type="text/plain",
+        charset="utf-8",
+    )
+
+
+async def healthz(request: web.Request) -> web.Response:
+    from ai_logic import gemini_stats
+
+    return web.json_response({
+        "status": "ok",
+        "sessions": len(request.app["sessions"]),
+        "breaker": gemini_stats()["breaker_state"],
+    })
+
+
+async def _expire_sessions(app: web.Application) -> None:
+    while True:
+        await asyncio.sleep(60)
+        app["sessions"].expire(API_SESSION_TTL)
+
+
+async def _on_startup(app: web.Application) -> None:
+    app["expiry"] = asyncio.create_task(_expire_sessions(app))
+
+
+async def _on_cleanup(app: web.Application) -> None:
+    app["expiry"].cancel()
+    app["pool"].shutdown(wait=False, cancel_futures=True)
+
+
+def create_app(pool: Optional[ThreadPoolExecutor] = None) -> web.Application:
+    from ai_logic import SHARED_STATE_URL
+
+    store = get_store(SHARED_STATE_URL)
+    app = web.Application()
+    app["sessions"] = SessionRegistry(SessionStore(store, API_SESSION_TTL) if store else None)
+    app["pool"] = pool or ThreadPoolExecutor(API_WORKERS, thread_name_prefix="api")
+    app.on_startup.append(_on_startup)
+    app.on_cleanup.append(_on_cleanup)
+    app.router.add_post("/sessions", start_session)
+    app.router.add_get("/sessions/{id}", get_state)
+    app.router.add_delete("/sessions/{id}", delete_session)
+    app.router.add_post("/sessions/{id}/feedback", feedback)
+    app.router.add_post("/sessions/{id}/next", next_question)
+    app.router.add_post("/sessions/{id}/summary", summary)
+    app.router.add_get("/sessions/{id}/audio", question_audio)
+    app.router.add_get("/history", history)
+    app.router.add_get("/history/{id}", history_session)
+    app.router.add_get("/metrics", metrics_endpoint)
+    app.router.add_get("/healthz", healthz)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Interview API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--fake", action="store_true",
+                        help="start a local fake Gemini + TTS server and use it")
+    parser.add_argument("--fake-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.fake:
+        from fake_gemini import FakeConfig, start_fake_server
+
+        _, base_url = start_fake_server(FakeConfig(latency=args.fake_latency))
+        os.environ.update({
+            "GEMINI_API_KEY": "fake",
+            "GEMINI_BASE_URL": f"{base_url}/v1beta",
+            "TTS_BACKEND_URL": f"{base_url}/tts",
+        })
+        print(f"Using fake Gemini at {base_url}")
+
+    web.run_app(create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,21 @@ from streamlit_mic_recorder import speech_to_text
 from PIL import Image
 
 from ai_logic import (
-    generate_question,
-    get_feedback,
-    summarize_session,
-    question_to_audio_bytes,
+    cached_audio_bytes,
+    tts_cache_stats,
+    gemini_stats,
+    scheduler_stats,
+    prefetch_hit_rate,
+    PREFETCH_STATS,
+)
+from interview_engine import InterviewSession
+from question_bank import bank_stats
+from storage import (
+    query_sessions,
+    get_session,
+    list_roles,
+    history_cache_stats,
 )
-from storage import load_history, save_session, build_session_record
 
 
 # ---------- Styling ----------
@@ -270,171 +279,79 @@ def init_state():
     if "page" not in st.session_state:
         st.session_state.page = "Interview"  # Interview or History
 
-    if "stage" not in st.session_state:
-        st.session_state.stage = "setup"  # setup, interview, summary
-
-    if "role" not in st.session_state:
-        st.session_state.role = ""
-
-    if "interview_type" not in st.session_state:
-        st.session_state.interview_type = "Behavioral"
-
-    if "mode" not in st.session_state:
-        st.session_state.mode = "Standard mock"  # Quick / Standard / Deep
-
-    if "level" not in st.session_state:
-        st.session_state.level = "beginner"
-
-    if "total_questions" not in st.session_state:
-        st.session_state.total_questions = 3
-
-    if "resume_text" not in st.session_state:
-        st.session_state.resume_text = ""
-
-    if "job_text" not in st.session_state:
-        st.session_state.job_text = ""
-
-    if "current_index" not in st.session_state:
-        st.session_state.current_index = 0
-
-    if "current_question" not in st.session_state:
-        st.session_state.current_question = ""
+    # 👇 the interview itself: settings, stage, questions, answers, background work
+    if "engine" not in st.session_state:
+        st.session_state.engine = InterviewSession()
 
-    if "current_answer" not in st.session_state:
-        st.session_state.current_answer = ""
+    # 👇 History page: pagination and the one session that is opened
+    if "history_page" not in st.session_state:
+        st.session_state.history_page = 1
 
-    if "current_feedback" not in st.session_state:
-        st.session_state.current_feedback = ""
+    if "history_page_size" not in st.session_state:
+        st.session_state.history_page_size = 20
 
-    if "qa_list" not in st.session_state:
-        st.session_state.qa_list = []
+    if "history_filters" not in st.session_state:
+        st.session_state.history_filters = None
 
-    if "overall_summary" not in st.session_state:
-        st.session_state.overall_summary = ""
-
-    if "error" not in st.session_state:
-        st.session_state.error = ""
-
-    # 👇 track previously asked questions to avoid repeats
-    if "previous_questions" not in st.session_state:
-        st.session_state.previous_questions = []
+    if "history_open_id" not in st.session_state:
+        st.session_state.history_open_id = None
 
 
 def reset_interview():
-    st.session_state.stage = "setup"
-    st.session_state.role = ""
-    st.session_state.interview_type = "Behavioral"
-    st.session_state.mode = "Standard mock"
-    st.session_state.level = "beginner"
-    st.session_state.total_questions = 3
-    st.session_state.resume_text = ""
-    st.session_state.job_text = ""
-    st.session_state.current_index = 0
-    st.session_state.current_question = ""
-    st.session_state.current_answer = ""
-    st.session_state.current_feedback = ""
-    st.session_state.qa_list = []
-    st.session_state.overall_summary = ""
-    st.session_state.error = ""
-    st.session_state.previous_questions = []
+    st.session_state.engine.reset()
 
 
 # ---------- Logic ----------
 
 def start_interview():
-    if not st.session_state.role.strip():
+    engine = st.session_state.engine
+    if not engine.role.strip():
         st.warning("Please enter a target role.")
         return
-
-    try:
-        st.session_state.error = ""
-        st.session_state.current_index = 1
-        st.session_state.previous_questions = []
-
-        # First question, with no previous questions
-        q = generate_question(
-            interview_type=st.session_state.interview_type,
-            role=st.session_state.role,
-            level=st.session_state.level,
-            resume_text=st.session_state.resume_text,
-            job_text=st.session_state.job_text,
-            previous_questions=st.session_state.previous_questions,
-        )
-        st.session_state.current_question = q
-        st.session_state.previous_questions.append(q)
-
-        st.session_state.current_answer = ""
-        st.session_state.current_feedback = ""
-        st.session_state.qa_list = []
-        st.session_state.overall_summary = ""
-        st.session_state.stage = "interview"
-    except Exception as e:
-        st.session_state.error = f"Error starting interview: {e}"
-
-
-def save_current_qa():
-    if not st.session_state.current_question:
-        return
-    if not st.session_state.current_answer.strip():
-        return
-
-    st.session_state.qa_list.append(
-        {
-            "question": st.session_state.current_question,
-            "answer": st.session_state.current_answer,
-            "feedback": st.session_state.current_feedback,
-        }
-    )
+    engine.start()
 
 
 def go_next_question():
-    save_current_qa()
-
-    if st.session_state.current_index >= st.session_state.total_questions:
-        st.session_state.stage = "summary"
-        return
-
-    try:
-        st.session_state.error = ""
-        # current question is already in previous_questions from start_interview()
-
-        st.session_state.current_index += 1
-        q = generate_question(
-            interview_type=st.session_state.interview_type,
-            role=st.session_state.role,
-            level=st.session_state.level,
-            resume_text=st.session_state.resume_text,
-            job_text=st.session_state.job_text,
-            previous_questions=st.session_state.previous_questions,
-        )
-        st.session_state.current_question = q
-        st.session_state.previous_questions.append(q)
-
-        st.session_state.current_answer = ""
-        st.session_state.current_feedback = ""
-    except Exception as e:
-        st.session_state.error = f"Error getting next question: {e}"
+    st.session_state.engine.next_question()
 
 
 def create_overall_summary():
-    if not st.session_state.qa_list:
+    engine = st.session_state.engine
+    if not engine.qa_list:
         st.warning("No answers to summarize.")
         return
 
+    filled = False
     try:
-        st.session_state.error = ""
-        st.session_state.overall_summary = summarize_session(
-            role=st.session_state.role,
-            interview_type=st.session_state.interview_type,
-            qa_list=st.session_state.qa_list,
-        )
+        with st.spinner("Finishing your review…"):
+            stream, filled = engine.summary_stream()
+        st.markdown("### Overall summary and score")
+        # Render chunks as they arrive; the engine keeps the full text for saving
+        st.write_stream(stream)
     except Exception as e:
-        st.session_state.error = f"Error creating summary: {e}"
+        engine.error = f"Error creating summary: {e}"
+
+    if filled:
+        # Redraw the answer list above with the new feedback
+        st.rerun()
 
 
 # ---------- UI sections ----------
 
+@st.fragment(run_every=1)
+def render_pending_audio():
+    """
+    Poll the background synthesis and rerun the page once audio is ready.
+    """
+    engine = st.session_state.engine
+    future = engine.audio_future
+    if future is None or future.done():
+        st.rerun()
+    st.caption("Preparing audio…")
+
+
 def render_sidebar():
+    engine = st.session_state.engine
     # Logo + title
     st.sidebar.markdown(
         """
@@ -465,11 +382,43 @@ def render_sidebar():
 
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Session status**")
-    st.sidebar.write(f"Stage: {st.session_state.stage}")
-    if st.session_state.stage != "setup":
+    st.sidebar.write(f"Stage: {engine.stage}")
+    if engine.stage != "setup":
         st.sidebar.write(
-            f"Question {st.session_state.current_index} "
-            f"of {st.session_state.total_questions}"
+            f"Question {engine.current_index} "
+            f"of {engine.total_questions}"
+        )
+
+    used = PREFETCH_STATS["hits"] + PREFETCH_STATS["misses"]
+    if used:
+        st.sidebar.caption(
+            f"Prefetch hit rate: {prefetch_hit_rate():.0%} ({used} transitions)"
+        )
+
+    gemini = gemini_stats()
+    if gemini["requests"] or gemini["breaker_rejections"]:
+        st.sidebar.caption(
+            f"Gemini: {gemini['requests']} requests · {gemini['retries']} retries · "
+            f"{gemini['failures']} failures · breaker {gemini['breaker_state']}"
+        )
+        queue = scheduler_stats()
+        st.sidebar.caption(
+            f"Rate limiter: {queue['depth']} queued · "
+            f"avg wait {queue['wait_avg']:.1f}s · {queue['rejected']} rejected"
+        )
+
+    bank = bank_stats()
+    if bank["hits"] or bank["misses"]:
+        st.sidebar.caption(
+            f"Question bank: {bank['questions']} questions · "
+            f"{bank['hits']} served · {bank['misses']} misses"
+        )
+
+    audio = tts_cache_stats()
+    if audio["memory_hits"] or audio["disk_hits"] or audio["misses"]:
+        st.sidebar.caption(
+            f"Audio cache: {audio['memory_hits'] + audio['disk_hits']} hits · "
+            f"{audio['misses']} misses · {audio['bytes'] // 1024} KB"
         )
 
     st.sidebar.markdown("---")
@@ -478,6 +427,7 @@ def render_sidebar():
 
 
 def render_setup():
+    engine = st.session_state.engine
     st.markdown('<div class="section-label">Step 1 · Configure</div>', unsafe_allow_html=True)
     st.subheader("Set up your voice interview 🎯")
 
@@ -485,38 +435,38 @@ def render_setup():
 
     with col_left:
         # Mode
-        st.session_state.mode = st.selectbox(
+        engine.mode = st.selectbox(
             "Mode",
             ["Quick drill", "Standard mock", "Deep session"],
             index=["Quick drill", "Standard mock", "Deep session"].index(
-                st.session_state.mode
+                engine.mode
             ),
             help="Quick drill: 1–2 questions · Standard: 3–5 · Deep: 6–10",
         )
 
-        st.session_state.role = st.text_input(
+        engine.role = st.text_input(
             "Target role",
-            value=st.session_state.role,
+            value=engine.role,
             placeholder="For example: Junior Python Developer",
         )
 
-        st.session_state.interview_type = st.radio(
+        engine.interview_type = st.radio(
             "Interview type",
             ["Behavioral", "Professional", "Resume-based"],
             index=["Behavioral", "Professional", "Resume-based"].index(
-                st.session_state.interview_type
-                if st.session_state.interview_type in
+                engine.interview_type
+                if engine.interview_type in
                 ["Behavioral", "Professional", "Resume-based"]
                 else "Behavioral"
             ),
             horizontal=True,
         )
 
-        st.session_state.level = st.selectbox(
+        engine.level = st.selectbox(
             "Difficulty",
             ["beginner", "intermediate", "advanced"],
             index=["beginner", "intermediate", "advanced"].index(
-                st.session_state.level
+                engine.level
             ),
         )
 
@@ -526,44 +476,59 @@ def render_setup():
             "Standard mock": 4,
             "Deep session": 8,
         }
-        suggested = mode_defaults.get(st.session_state.mode, 4)
+        suggested = mode_defaults.get(engine.mode, 4)
 
         current_default = (
-            st.session_state.total_questions
-            if st.session_state.total_questions
+            engine.total_questions
+            if engine.total_questions
             else suggested
         )
 
-        st.session_state.total_questions = st.slider(
+        engine.total_questions = st.slider(
             "Number of questions",
             min_value=1,
             max_value=10,
             value=current_default,
-            help=f"Suggested for {st.session_state.mode}: {suggested} questions",
+            help=f"Suggested for {engine.mode}: {suggested} questions",
+        )
+
+        engine.plan_mode = st.checkbox(
+            "Plan all questions up front",
+            value=engine.plan_mode,
+            help="Ask for the whole question set in one AI call. "
+                 "Falls back to one call per question if that fails.",
+        )
+
+        engine.incremental_summary = st.checkbox(
+            "Build the summary as I go",
+            value=engine.incremental_summary,
+            help="Keep short running notes after each answer (one extra AI "
+                 "call per answer) so the final rating needs only a small prompt.",
         )
 
         with st.expander("Optional: Paste your resume text"):
-            st.session_state.resume_text = st.text_area(
+            engine.resume_text = st.text_area(
                 "Resume text",
-                value=st.session_state.resume_text,
+                value=engine.resume_text,
                 height=110,
             )
 
         with st.expander("Optional: Paste job description"):
-            st.session_state.job_text = st.text_area(
+            engine.job_text = st.text_area(
                 "Job description",
-                value=st.session_state.job_text,
+                value=engine.job_text,
                 height=110,
             )
 
         if st.button("Start voice interview 🎤"):
             start_interview()
 
-        if st.session_state.error:
-            st.error(st.session_state.error)
+        if engine.error:
+            st.error(engine.error)
 
 
 def render_interview():
+    engine = st.session_state.engine
     st.markdown('<div class="section-label">Step 2 · Practice</div>', unsafe_allow_html=True)
     st.subheader("Live interview view 🎥")
 
@@ -580,11 +545,11 @@ def render_interview():
                   <div class="zoom-avatar">AI</div>
                   <div class="zoom-name-role">
                     <div class="zoom-name">AI Interviewer</div>
-                    <div class="zoom-role">{st.session_state.role or "Candidate Interview"}</div>
+                    <div class="zoom-role">{engine.role or "Candidate Interview"}</div>
                   </div>
                 </div>
                 <div style="font-size:0.9rem; color:#e5e7eb; margin-bottom:0.7rem;">
-                  {st.session_state.current_question or "No question yet."}
+                  {engine.current_question or "No question yet."}
                 </div>
               </div>
               <div>
@@ -594,11 +559,24 @@ def render_interview():
 
         # Question audio player inside the zoom frame
         st.markdown("**Listen to the question:**")
-        audio_bytes = question_to_audio_bytes(st.session_state.current_question)
+        question = engine.current_question
+        audio_bytes = cached_audio_bytes(question)
         if audio_bytes:
             st.audio(audio_bytes, format="audio/mp3")
-        else:
+        elif not question:
             st.caption("No question yet.")
+        else:
+            if engine.audio_question != question:
+                engine.start_question_audio()
+            future = engine.audio_future
+            if future.done():
+                audio_bytes = future.result()
+                if audio_bytes:
+                    st.audio(audio_bytes, format="audio/mp3")
+                else:
+                    st.caption("Audio is not available for this question.")
+            else:
+                render_pending_audio()
 
         st.markdown(
             """
@@ -614,10 +592,10 @@ def render_interview():
     # RIGHT SIDE: record, answer box, buttons, feedback
     with col_right:
         st.caption(
-            f"Mode: {st.session_state.mode} · "
-            f"Type: {st.session_state.interview_type} · "
-            f"Level: {st.session_state.level} · "
-            f"Question {st.session_state.current_index} of {st.session_state.total_questions}"
+            f"Mode: {engine.mode} · "
+            f"Type: {engine.interview_type} · "
+            f"Level: {engine.level} · "
+            f"Question {engine.current_index} of {engine.total_questions}"
         )
 
         # Record your answer ABOVE the answer box
@@ -629,51 +607,51 @@ def render_interview():
             key="answer_recorder",
         )
         if recorded_text:
-            st.session_state.current_answer = recorded_text
+            engine.current_answer = recorded_text
 
         st.markdown("### Your answer (edit if needed)")
-        st.session_state.current_answer = st.text_area(
+        engine.current_answer = st.text_area(
             "Answer",
-            value=st.session_state.current_answer,
+            value=engine.current_answer,
             height=200,
         )
 
         col3, col4 = st.columns(2)
         with col3:
-            if st.button("Get feedback ⭐"):
-                if not st.session_state.current_answer.strip():
-                    st.warning("Please answer first.")
-                else:
-                    try:
-                        st.session_state.error = ""
-                        st.session_state.current_feedback = get_feedback(
-                            st.session_state.current_question,
-                            st.session_state.current_answer,
-                        )
-                    except Exception as e:
-                        st.session_state.error = f"Error getting feedback: {e}"
+            feedback_clicked = st.button("Get feedback ⭐")
+            if feedback_clicked and not engine.current_answer.strip():
+                st.warning("Please answer first.")
+                feedback_clicked = False
 
         with col4:
             if st.button("Next question ➡️"):
                 go_next_question()
 
-        if st.session_state.current_feedback:
+        if feedback_clicked:
+            try:
+                st.markdown("### AI feedback")
+                # Render chunks as they arrive; the engine keeps the full text
+                st.write_stream(engine.feedback_stream())
+            except Exception as e:
+                engine.error = f"Error getting feedback: {e}"
+        elif engine.current_feedback:
             st.markdown("### AI feedback")
-            st.write(st.session_state.current_feedback)
+            st.write(engine.current_feedback)
 
-        if st.session_state.error:
-            st.error(st.session_state.error)
+        if engine.error:
+            st.error(engine.error)
 
 
 def render_summary():
+    engine = st.session_state.engine
     st.markdown('<div class="section-label">Step 3 · Review</div>', unsafe_allow_html=True)
     st.subheader("Overall rating and feedback 📝")
 
-    if not st.session_state.qa_list:
+    if not engine.qa_list:
         st.info("No answers recorded yet.")
         return
 
-    for i, item in enumerate(st.session_state.qa_list, start=1):
+    for i, item in enumerate(engine.qa_list, start=1):
         st.markdown(f"#### Question {i}")
         st.write(item["question"])
         st.markdown("**Your answer:**")
@@ -683,66 +661,136 @@ def render_summary():
             st.write(item["feedback"])
         st.markdown("---")
 
-    if not st.session_state.overall_summary:
+    streamed = False
+    if not engine.overall_summary:
         if st.button("Generate overall rating 🧠"):
             create_overall_summary()
+            streamed = True
 
-    if st.session_state.overall_summary:
+    if engine.overall_summary and not streamed:
         st.markdown("### Overall summary and score")
-        st.write(st.session_state.overall_summary)
+        st.write(engine.overall_summary)
 
     if st.button("Save this interview to history 💾"):
-        record = build_session_record(
-            role=st.session_state.role,
-            interview_type=st.session_state.interview_type,
-            level=st.session_state.level,
-            total_questions=st.session_state.total_questions,
-            qa_list=st.session_state.qa_list,
-            summary_text=st.session_state.overall_summary,
-        )
-        save_session(record)
+        engine.save()
         st.success("Interview saved to history.")
 
     if st.button("Start a new interview"):
         reset_interview()
 
-    if st.session_state.error:
-        st.error(st.session_state.error)
+    if engine.error:
+        st.error(engine.error)
+
+
+def render_session_details(session_id):
+    """Full Q&A of one saved session, loaded only when it is opened."""
+    session = get_session(session_id)
+    if session is None:
+        st.warning("This session could not be loaded.")
+        return
+
+    st.markdown(f"**Role:** {session['role']}")
+    st.markdown(f"**Type:** {session['interview_type']}")
+    st.markdown(f"**Level:** {session['level']}")
+    st.markdown(f"**Questions:** {session['total_questions']}")
+
+    st.markdown("---")
+    for j, item in enumerate(session["qa_list"], start=1):
+        st.markdown(f"**Question {j}:** {item['question']}")
+        st.markdown("Your answer:")
+        st.write(item["answer"])
+        if item.get("feedback"):
+            st.markdown("Feedback:")
+            st.write(item["feedback"])
+        st.markdown("---")
+
+    if session.get("summary"):
+        st.markdown("**Final summary:**")
+        st.write(session["summary"])
 
 
 def render_history():
     st.markdown('<div class="section-label">History</div>', unsafe_allow_html=True)
     st.subheader("Past interview sessions 📚")
 
-    history = load_history()
-    if not history:
+    col_role, col_type, col_level, col_size = st.columns(4)
+    with col_role:
+        role = st.selectbox("Role", ["All"] + list_roles())
+    with col_type:
+        interview_type = st.selectbox(
+            "Type", ["All", "Behavioral", "Professional", "Resume-based"]
+        )
+    with col_level:
+        level = st.selectbox(
+            "Level", ["All", "beginner", "intermediate", "advanced"]
+        )
+    with col_size:
+        page_size = st.selectbox(
+            "Per page",
+            [10, 20, 50, 100],
+            index=[10, 20, 50, 100].index(st.session_state.history_page_size),
+        )
+    st.session_state.history_page_size = page_size
+
+    # New filters start again from the first page
+    filters = (role, interview_type, level, page_size)
+    if filters != st.session_state.history_filters:
+        st.session_state.history_filters = filters
+        st.session_state.history_page = 1
+
+    headers, total = query_sessions(
+        role=None if role == "All" else role,
+        interview_type=None if interview_type == "All" else interview_type,
+        level=None if level == "All" else level,
+        page=st.session_state.history_page,
+        page_size=page_size,
+    )
+    if not total:
         st.info("No saved sessions yet.")
         return
 
-    for i, session in enumerate(history, start=1):
+    pages = (total + page_size - 1) // page_size
+    first = (st.session_state.history_page - 1) * page_size
+
+    for i, header in enumerate(headers, start=first + 1):
+        score = f" – score {header['score']:g}/10" if header.get("score") is not None else ""
         label = (
-            f"Session {i} – {session['timestamp']} – "
-            f"{session['role']} ({session['interview_type']}, {session['level']})"
+            f"Session {i} – {header['timestamp']} – "
+            f"{header['role']} ({header['interview_type']}, {header['level']}){score}"
         )
-        with st.expander(label):
-            st.markdown(f"**Role:** {session['role']}")
-            st.markdown(f"**Type:** {session['interview_type']}")
-            st.markdown(f"**Level:** {session['level']}")
-            st.markdown(f"**Questions:** {session['total_questions']}")
-
-            st.markdown("---")
-            for j, item in enumerate(session["qa_list"], start=1):
-                st.markdown(f"**Question {j}:** {item['question']}")
-                st.markdown("Your answer:")
-                st.write(item["answer"])
-                if item.get("feedback"):
-                    st.markdown("Feedback:")
-                    st.write(item["feedback"])
-                st.markdown("---")
-
-            if session.get("summary"):
-                st.markdown("**Final summary:**")
-                st.write(session["summary"])
+        is_open = st.session_state.history_open_id == header["id"]
+
+        col_label, col_button = st.columns([5, 1])
+        with col_label:
+            st.markdown(f"**{label}**")
+        with col_button:
+            if st.button("Close" if is_open else "Open", key=f"history_{header['id']}"):
+                st.session_state.history_open_id = None if is_open else header["id"]
+                st.rerun()
+
+        if is_open:
+            with st.container(border=True):
+                render_session_details(header["id"])
+
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("⬅️ Newer", disabled=st.session_state.history_page <= 1):
+            st.session_state.history_page -= 1
+            st.rerun()
+    with col_info:
+        st.caption(
+            f"Page {st.session_state.history_page} of {pages} · {total} sessions"
+        )
+
+    cache = history_cache_stats()
+    st.caption(
+        f"History cache: {cache['hit_rate']:.0%} hits · "
+        f"{cache['full_loads']} full / {cache['incremental_loads']} incremental loads"
+    )
+    with col_next:
+        if st.button("Older ➡️", disabled=st.session_state.history_page >= pages):
+            st.session_state.history_page += 1
+            st.rerun()
 
 
 def main():
@@ -777,12 +825,13 @@ def main():
 
     st.markdown("---")
 
+    engine = st.session_state.engine
     if st.session_state.page == "Interview":
-        if st.session_state.stage == "setup":
+        if engine.stage == "setup":
             render_setup()
-        elif st.session_state.stage == "interview":
+        elif engine.stage == "interview":
             render_interview()
-        elif st.session_state.stage == "summary":
+        elif engine.stage == "summary":
             render_summary()
         else:
             reset_interview()
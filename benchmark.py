@@ -0,0 +1,232 @@
+"""
+Offline benchmark: full simulated interviews against the fake Gemini server.
+
+Each simulated candidate is an InterviewSession going through the same steps
+as the app: first question -> audio -> answer -> streamed feedback -> next
+question (prefetched) -> ... -> summary -> save to history. Nothing touches
+the real Gemini API, gTTS or your history file (everything runs in a temp
+folder).
+
+    python benchmark.py --sessions 50 --concurrency 10 --questions 4
+    python benchmark.py --latency 0.5 --error-rate 0.05 --plan-mode
+    python benchmark.py --base-url http://127.0.0.1:8765   # external fake server
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List
+
+from fake_gemini import FakeConfig, start_fake_server
+
+ROLES = ["Junior Python Developer", "Data Analyst", "Product Manager", "DevOps Engineer"]
+TYPES = ["Behavioral", "Professional"]
+LEVELS = ["beginner", "intermediate", "advanced"]
+
+
+class Recorder:
+    """Thread-safe latency samples per operation."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, op: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(op, []).append(seconds)
+
+    def error(self, op: str) -> None:
+        with self._lock:
+            self.errors[op] = self.errors.get(op, 0) + 1
+
+    @contextmanager
+    def time(self, op: str):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.error(op)
+            raise
+        self.add(op, time.perf_counter() - start)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def run_session(n: int, args, rec: Recorder) -> None:
+    """One simulated interview, driven through the same engine as the app."""
+    from interview_engine import STAGE_SUMMARY, InterviewSession
+
+    session = InterviewSession(
+        role=ROLES[n % len(ROLES)],
+        interview_type=TYPES[n % len(TYPES)],
+        level=LEVELS[n % len(LEVELS)],
+        total_questions=args.questions,
+        plan_mode=args.plan_mode,
+        incremental_summary=args.incremental,
+    )
+    session_start = time.perf_counter()
+
+    with rec.time("start"):
+        session.start()
+    if session.error:
+        raise RuntimeError(session.error)
+
+    while session.stage != STAGE_SUMMARY:
+        with rec.time("audio"):
+            session.audio_future.result()
+
+        time.sleep(args.think_time)
+        session.current_answer = (
+            f"Candidate {n}, answer {session.current_index}: "
+            + "I would start by clarifying the goal, then " * 3
+        )
+
+        start = time.perf_counter()
+        with rec.time("feedback"):
+            for i, _ in enumerate(session.feedback_stream()):
+                if i == 0:
+                    rec.add("feedback_first_chunk", time.perf_counter() - start)
+
+        op = "next_question" if session.current_index < session.total_questions else "finish"
+        with rec.time(op):
+            session.next_question()
+        if session.error:
+            raise RuntimeError(session.error)
+
+    with rec.time("summary"):
+        session.summarize()
+
+    with rec.time("save"):
+        session.save()
+    rec.add("session", time.perf_counter() - session_start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline load benchmark for the interview logic")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=4)
+    parser.add_argument("--think-time", type=float, default=0.0,
+                        help="seconds a candidate 'answers' before asking for feedback")
+    parser.add_argument("--plan-mode", action="store_true")
+    parser.add_argument("--incremental", action="store_true",
+                        help="build the summary as you go instead of at the end")
+    parser.add_argument("--no-bank", action="store_true", help="disable the question bank")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="client rate limit in requests/minute (0 = off)")
+    parser.add_argument("--workers", type=int, default=None, help="BACKGROUND_WORKERS")
+    parser.add_argument("--base-url", default="", help="use an already running fake server")
+    parser.add_argument("--latency", type=float, default=FakeConfig.latency)
+    parser.add_argument("--jitter", type=float, default=FakeConfig.jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeConfig.error_rate)
+    parser.add_argument("--response-chars", type=int, default=FakeConfig.response_chars)
+    parser.add_argument("--tts-latency", type=float, default=FakeConfig.tts_latency)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url.rstrip("/")
+    if not base_url:
+        server, base_url = start_fake_server(FakeConfig(
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            response_chars=args.response_chars,
+            tts_latency=args.tts_latency,
+        ))
+
+    # Settings are read when ai_logic is imported, so set them first
+    os.environ.update({
+        "GEMINI_API_KEY": "fake",
+        "GEMINI_BASE_URL": f"{base_url}/v1beta",
+        "TTS_BACKEND_URL": f"{base_url}/tts",
+        "GEMINI_RATE_PER_MINUTE": str(args.rate),
+        "QUESTION_BANK_ENABLED": "false" if args.no_bank else "true",
+        "GEMINI_POOL_SIZE": str(max(args.concurrency * 2, 10)),
+        "GEMINI_MAX_CONCURRENCY": str(max(args.concurrency * 2, 8)),
+    })
+    if args.workers:
+        os.environ["BACKGROUND_WORKERS"] = str(args.workers)
+    workdir = tempfile.mkdtemp(prefix="interview-bench-")
+    os.chdir(workdir)
+
+    import ai_logic
+    import metrics
+
+    rec = Recorder()
+    failed = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_session, n, args, rec) for n in range(args.sessions)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                failed += 1
+    elapsed = time.perf_counter() - started
+    ai_logic.close_async_client()
+
+    completed = args.sessions - failed
+    calls = metrics.summary()
+    report = {
+        "sessions": args.sessions,
+        "failed_sessions": failed,
+        "concurrency": args.concurrency,
+        "questions": args.questions,
+        "elapsed_s": round(elapsed, 3),
+        "sessions_per_s": round(completed / elapsed, 3) if elapsed else 0.0,
+        "latency_s": {
+            op: {
+                "count": len(values),
+                "p50": round(percentile(values, 50), 4),
+                "p95": round(percentile(values, 95), 4),
+                "p99": round(percentile(values, 99), 4),
+            }
+            for op, values in sorted(rec.samples.items())
+        },
+        "errors": rec.errors,
+        "calls_per_session": {
+            kind: round(row["calls"] / max(completed, 1), 2) for kind, row in sorted(calls.items())
+        },
+        "gemini": ai_logic.gemini_stats(),
+        "server_requests": dict(server.stats) if server else None,
+        "workdir": workdir,
+    }
+    if server:
+        server.shutdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{completed}/{args.sessions} sessions in {elapsed:.2f}s "
+          f"({report['sessions_per_s']} sessions/s, concurrency {args.concurrency})")
+    print(f"{'operation':<22}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for op, row in report["latency_s"].items():
+        print(f"{op:<22}{row['count']:>7}{row['p50']:>9.3f}{row['p95']:>9.3f}{row['p99']:>9.3f}")
+    print("Calls per session: " + ", ".join(
+        f"{kind} {n}" for kind, n in report["calls_per_session"].items()
+    ))
+    gemini = report["gemini"]
+    print(f"Gemini HTTP: {gemini['requests']} requests, {gemini['retries']} retries, "
+          f"{gemini['failures']} failures, breaker {gemini['breaker_state']}")
+    if report["server_requests"] is not None:
+        print(f"Fake server: {report['server_requests']}")
+    if rec.errors:
+        print(f"Errors: {rec.errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+def content_key(*parts: str) -> str:
+    """Stable hash of some strings, used as a cache key / file name."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class MemoryLRU:
+    """Thread-safe in-memory LRU of bytes values, bounded by total size."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._items[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._items),
+                "bytes": self._bytes,
+            }
+
+
+class DiskStore:
+    """Directory of files named by key. Writes are atomic (temp + rename)."""
+
+    def __init__(self, directory: Path, suffix: str = ""):
+        self.directory = Path(directory)
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.suffix}"
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            data = self._path(key).read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, value: bytes) -> None:
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            # Disk cache is best effort
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+# ---------- Response caches (text values with TTL) ----------
+#
+# Any object with get(key) -> Optional[str], put(key, value, ttl) and
+# stats() -> dict can be used as a response cache backend.
+
+class MemoryTTLCache:
+    """Thread-safe in-memory LRU of text values with per-entry expiry."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] < time.time():
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = (time.time() + ttl, value)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._items)}
+
+
+class DiskTTLCache:
+    """One JSON file per entry; oldest files are pruned past max_entries."""
+
+    def __init__(self, directory: Path, max_entries: int):
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            with self._path(key).open("r", encoding="utf-8") as f:
+                item = json.load(f)
+        except (OSError, ValueError):
+            item = None
+        if item is None or item.get("expires", 0) < time.time():
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return item.get("value")
+
+    def put(self, key: str, value: str, ttl: float) -> None:
+        data = json.dumps({"expires": time.time() + ttl, "value": value}).encode("utf-8")
+        DiskStore(self.directory, suffix=".json").put(key, data)
+        with self._lock:
+            self._puts += 1
+            # Listing the folder is O(entries), so only prune now and then
+            if self._puts % 64 == 0:
+                self._prune()
+
+    def _prune(self) -> None:
+        try:
+            files = sorted(self.directory.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        except OSError:
+            return
+        for path in files[:max(len(files) - self.max_entries, 0)]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class StoreTTLCache:
+    """Response cache on a shared store (see shared_state.py), for many workers."""
+
+    def __init__(self, store, prefix: str = "response:"):
+        self.store = store
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            data = self.store.get(self.prefix + key)
+        except Exception:
+            # Shared cache is best effort, like the disk one
+            data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return data.decode("utf-8")
+
+    def put(self, key: str, value: str, ttl: float) -> None:
+        try:
+            self.store.put(self.prefix + key, value.encode("utf-8"), ttl)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+class StoreBlobs:
+    """DiskStore-compatible bytes cache on a shared store."""
+
+    def __init__(self, store, prefix: str, ttl: Optional[float] = None):
+        self.store = store
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            data = self.store.get(self.prefix + key)
+        except Exception:
+            data = None
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def put(self, key: str, value: bytes) -> None:
+        try:
+            self.store.put(self.prefix + key, value, self.ttl)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def make_response_cache(backend: str, max_entries: int, directory: Path, store=None):
+    """
+    Build a response cache for "memory", "disk", "shared" (needs a store) or
+    "none" (returns None).
+    """
+    if backend == "memory":
+        return MemoryTTLCache(max_entries)
+    if backend == "disk":
+        return DiskTTLCache(directory, max_entries)
+    if backend == "shared":
+        if store is None:
+            raise ValueError('RESPONSE_CACHE_BACKEND is "shared" but SHARED_STATE_URL is not set')
+        return StoreTTLCache(store)
+    return None
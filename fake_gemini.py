@@ -0,0 +1,226 @@
+"""
+Local stand-in for the Gemini REST API and the TTS service.
+
+Serves generateContent, streamGenerateContent (SSE) and a /tts endpoint with
+configurable latency, error rate and payload size, so the app and the
+benchmark can run without network access or API quota:
+
+    python fake_gemini.py --port 8765 --latency 0.3 --error-rate 0.05
+
+then point the app at it with GEMINI_BASE_URL=http://127.0.0.1:8765/v1beta
+and TTS_BACKEND_URL=http://127.0.0.1:8765/tts.
+"""
+import argparse
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+_TOPICS = [
+    "debugging a production issue", "working with a difficult teammate",
+    "meeting a tight deadline", "learning a new technology quickly",
+    "designing a REST API", "improving test coverage", "handling feedback",
+    "prioritizing competing tasks", "a project you are proud of",
+    "optimizing slow code", "explaining a technical idea to non-engineers",
+    "recovering from a mistake", "reviewing someone else's code",
+    "choosing between two designs", "mentoring a junior colleague",
+]
+_counter = itertools.count(1)
+
+
+@dataclass
+class FakeConfig:
+    latency: float = 0.2        # mean seconds per request (before the body)
+    jitter: float = 0.05        # +/- uniform jitter on latency
+    error_rate: float = 0.0     # share of requests answered with 503
+    fail_first: int = 0         # answer the first N requests per endpoint with 503
+    retry_after: float = 0.0    # Retry-After seconds sent with errors (0 = none)
+    response_chars: int = 600   # size of feedback/summary replies
+    stream_chunks: int = 6      # SSE chunks per streamed reply
+    tts_latency: float = 0.1
+    tts_bytes: int = 16000
+
+
+def _question() -> str:
+    n = next(_counter)
+    topic = random.choice(_TOPICS)
+    return f"Question {n}: can you tell me about {topic} and what you learned from it?"
+
+
+def _reply_text(prompt: str, config: FakeConfig) -> str:
+    if "Generate ONE new interview question" in prompt:
+        return _question()
+    # Non-ASCII on purpose: "✅" contains the byte 0x85, "è" needs UTF-8
+    filler = "Très bien: the answer shows good structure ✅ but could use a concrete example. "
+    text = "Overall score: 7/10\n"
+    while len(text) < config.response_chars:
+        text += filler
+    return text[: config.response_chars]
+
+
+def _plan_text(prompt: str) -> str:
+    match = re.search(r"Generate (\d+) distinct", prompt)
+    count = int(match.group(1)) if match else 5
+    return json.dumps({"questions": [_question() for _ in range(count)]})
+
+
+def _usage(prompt: str, text: str) -> dict:
+    prompt_tokens = len(prompt) // 4
+    reply_tokens = len(text) // 4
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": reply_tokens,
+        "totalTokenCount": prompt_tokens + reply_tokens,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: FakeConfig = FakeConfig()
+    # Requests served, by endpoint; replaced per server in start_fake_server
+    stats: dict = {}
+    stats_lock = threading.Lock()
+
+    def _count(self, name: str) -> int:
+        with self.stats_lock:
+            self.stats[name] = self.stats.get(name, 0) + 1
+            return self.stats[name]
+
+    def log_message(self, *args):
+        pass
+
+    def _sleep(self, base: float) -> None:
+        jitter = self.config.jitter
+        time.sleep(max(0.0, base + random.uniform(-jitter, jitter)))
+
+    def _send(self, status: int, body: bytes, content_type: str, headers=()) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        body = self._read_json()
+
+        if self.path.startswith("/tts"):
+            self._count("tts")
+            self._sleep(self.config.tts_latency)
+            self._send(200, b"\xff\xfb" + b"\0" * self.config.tts_bytes, "audio/mpeg")
+            return
+
+        if ":generateContent" not in self.path and ":streamGenerateContent" not in self.path:
+            self._send(404, b'{"error": "not found"}', "application/json")
+            return
+
+        streaming = ":streamGenerateContent" in self.path
+        served = self._count("stream" if streaming else "generate")
+        self._sleep(self.config.latency)
+        if served <= self.config.fail_first or random.random() < self.config.error_rate:
+            self._count("errors")
+            headers = []
+            if self.config.retry_after:
+                headers.append(("Retry-After", f"{self.config.retry_after:g}"))
+            self._send(503, b'{"error": {"code": 503, "message": "overloaded"}}', "application/json", headers)
+            return
+
+        prompt = body["contents"][0]["parts"][0]["text"]
+        json_mode = body.get("generationConfig", {}).get("responseMimeType") == "application/json"
+        text = _plan_text(prompt) if json_mode else _reply_text(prompt, self.config)
+
+        if streaming:
+            self._stream(prompt, text)
+            return
+
+        payload = {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}}],
+            "usageMetadata": _usage(prompt, text),
+        }
+        self._send(200, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _stream(self, prompt: str, text: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        n = max(self.config.stream_chunks, 1)
+        size = max(len(text) // n, 1)
+        pieces = [text[i:i + size] for i in range(0, len(text), size)]
+        for i, piece in enumerate(pieces):
+            event = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}}]}
+            if i == len(pieces) - 1:
+                event["usageMetadata"] = _usage(prompt, text)
+            # Raw UTF-8 (no \u escapes) and no charset, like the real API
+            self._chunk(f"data: {json.dumps(event, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+            # Spread the generation time over the chunks
+            time.sleep(self.config.latency / n)
+        self._chunk(b"")
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_fake_server(config: FakeConfig = None, port: int = 0) -> Tuple[ThreadingHTTPServer, str]:
+    """
+    Start the fake server on a background thread.
+
+    Returns (server, base URL like http://127.0.0.1:PORT); request counts are
+    in server.stats. Call server.shutdown() when done.
+    """
+    stats = {}
+    handler = type("Handler", (_Handler,), {"config": config or FakeConfig(), "stats": stats})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini + TTS server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=FakeConfig.latency)
+    parser.add_argument("--jitter", type=float, default=FakeConfig.jitter)
+    parser.add_argument("--error-rate", type=float, default=FakeConfig.error_rate)
+    parser.add_argument("--fail-first", type=int, default=FakeConfig.fail_first)
+    parser.add_argument("--retry-after", type=float, default=FakeConfig.retry_after)
+    parser.add_argument("--response-chars", type=int, default=FakeConfig.response_chars)
+    parser.add_argument("--stream-chunks", type=int, default=FakeConfig.stream_chunks)
+    parser.add_argument("--tts-latency", type=float, default=FakeConfig.tts_latency)
+    parser.add_argument("--tts-bytes", type=int, default=FakeConfig.tts_bytes)
+    args = parser.parse_args()
+
+    config = FakeConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        fail_first=args.fail_first,
+        retry_after=args.retry_after,
+        response_chars=args.response_chars,
+        stream_chunks=args.stream_chunks,
+        tts_latency=args.tts_latency,
+        tts_bytes=args.tts_bytes,
+    )
+    server, url = start_fake_server(config, args.port)
+    print(f"Fake Gemini at {url}/v1beta, fake TTS at {url}/tts (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
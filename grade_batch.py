@@ -0,0 +1,247 @@
+"""
+Grade many saved answers from the command line.
+
+    python grade_batch.py --out grades.jsonl                        # saved history
+    python grade_batch.py interview_history.json --out grades.jsonl
+    python grade_batch.py answers.jsonl --out grades.jsonl --concurrency 8 --rate 120
+
+Input is a history file (JSON array or JSONL of sessions) or a JSONL file of
+{"id", "question", "answer"} items; without a file the configured history is
+used. Items are streamed, graded with aget_feedback under bounded concurrency
+(and the shared client rate limit), and each result is appended to --out as
+one JSON line as soon as it is ready. Re-running with the same --out skips
+items already graded, so an interrupted run resumes where it stopped.
+
+Items that could not be graded go to <out>.failed.jsonl (rewritten on every
+run) instead of --out, so --out holds exactly one record per graded id and
+a re-run retries the failures.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Set
+
+
+def _qa_items(session: Dict[str, Any], prefix: str) -> Iterator[Dict[str, Any]]:
+    for position, item in enumerate(session.get("qa_list", []), start=1):
+        yield {
+            "id": f"{prefix}:{position}",
+            "question": item.get("question", ""),
+            "answer": item.get("answer", ""),
+            "role": session.get("role", ""),
+        }
+
+
+def iter_items(path: Optional[Path]) -> Iterator[Dict[str, Any]]:
+    """Q&A items with a stable id, read lazily from `path` or the history."""
+    if path is None:
+        from storage import iter_history
+
+        for n, session in enumerate(iter_history()):
+            yield from _qa_items(session, f"history-{n}")
+        return
+
+    with path.open("r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            # Legacy history: one JSON array, has to be read whole
+            for n, session in enumerate(json.load(f)):
+                if isinstance(session, dict):
+                    yield from _qa_items(session, f"session-{n}")
+            return
+
+        for n, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                print(f"Skipping line {n}: not valid JSON", file=sys.stderr)
+                continue
+            if not isinstance(record, dict):
+                print(f"Skipping line {n}: not a JSON object", file=sys.stderr)
+                continue
+            if "qa_list" in record:
+                yield from _qa_items(record, f"session-{n}")
+            elif record.get("question") and "answer" in record:
+                yield {
+                    "id": str(record.get("id", f"line-{n}")),
+                    "question": record["question"],
+                    "answer": record["answer"],
+                    "role": record.get("role", ""),
+                }
+
+
+def _write_line(f, record: Dict[str, Any]) -> None:
+    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    f.flush()
+
+
+def failed_file(out: Path) -> Path:
+    return out.with_name(out.name + ".failed.jsonl")
+
+
+def load_checkpoint(out: Path) -> Set[str]:
+    """Ids already graded successfully in an earlier run."""
+    done: Set[str] = set()
+    if not out.exists():
+        return done
+    with out.open("r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line of an interrupted run
+                continue
+            # Older runs wrote failures here too; those are retried
+            if not record.get("error"):
+                done.add(record["id"])
+    return done
+
+
+class Progress:
+    def __init__(self, every: float):
+        self.every = every
+        self.started = time.monotonic()
+        self.last = self.started
+        self.graded = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def tick(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self.last < self.every:
+            return
+        self.last = now
+        elapsed = max(now - self.started, 1e-9)
+        print(
+            f"{self.graded} graded, {self.failed} failed, {self.skipped} skipped · "
+            f"{self.graded / elapsed:.2f} answers/s · {elapsed:.0f}s",
+            file=sys.stderr,
+        )
+
+
+async def grade(args) -> Progress:
+    from ai_logic import FEEDBACK_FALLBACK, aget_feedback
+    from storage import extract_score
+
+    done = await asyncio.to_thread(load_checkpoint, args.out)
+    progress = Progress(args.progress_every)
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    # File I/O runs on threads so it never stalls the shared event loop that
+    # carries the HTTP requests; the lock keeps lines from interleaving
+    write_lock = asyncio.Lock()
+
+    failed_path = failed_file(args.out)
+    with args.out.open("a", encoding="utf-8") as out, \
+            failed_path.open("w", encoding="utf-8") as failed:
+        if out.tell() and not args.out.read_bytes().endswith(b"\n"):
+            # Start after a torn last line instead of appending to it
+            out.write("\n")
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                start = time.monotonic()
+                feedback = await aget_feedback(
+                    item["question"], item["answer"], use_cache=not args.no_cache
+                )
+                record = {
+                    **item,
+                    "feedback": feedback,
+                    "score": extract_score(feedback),
+                    "latency_s": round(time.monotonic() - start, 3),
+                }
+                if feedback == FEEDBACK_FALLBACK:
+                    # Not in --out, so a re-run retries it
+                    record.update(feedback="", score=None, error="Gemini request failed")
+                    target = failed
+                    progress.failed += 1
+                else:
+                    target = out
+                    progress.graded += 1
+                async with write_lock:
+                    await asyncio.to_thread(_write_line, target, record)
+                progress.tick()
+
+        workers = [asyncio.create_task(worker()) for _ in range(args.concurrency)]
+        count = 0
+        items = iter_items(args.input)
+        while True:
+            item = await asyncio.to_thread(next, items, None)
+            if item is None:
+                break
+            if args.limit and count >= args.limit:
+                break
+            if item["id"] in done or not item["answer"].strip():
+                progress.skipped += 1
+                continue
+            count += 1
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+
+    progress.tick(force=True)
+    return progress
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch-grade answers with Gemini")
+    parser.add_argument("input", nargs="?", type=Path,
+                        help="history JSON/JSONL or Q&A JSONL (default: saved history)")
+    parser.add_argument("--out", type=Path, required=True, help="results JSONL (appended)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=None,
+                        help="requests/minute (default: GEMINI_RATE_PER_MINUTE)")
+    parser.add_argument("--limit", type=int, default=0, help="grade at most this many")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="ignore cached replies, e.g. after changing the rubric")
+    parser.add_argument("--progress-every", type=float, default=5.0)
+    args = parser.parse_args()
+
+    # Settings are read when ai_logic is imported, so set them first
+    if args.rate is not None:
+        os.environ["GEMINI_RATE_PER_MINUTE"] = str(args.rate)
+    os.environ.setdefault("GEMINI_MAX_CONCURRENCY", str(max(args.concurrency, 8)))
+    os.environ.setdefault("GEMINI_QUEUE_MAX", str(max(args.concurrency, 50)))
+
+    import ai_logic
+
+    rate = ai_logic.GEMINI_RATE_PER_MINUTE
+    if rate > 0:
+        # A batch item should wait for its rate-limit token, not fail after
+        # the interactive timeout: with every worker queued, the last one
+        # waits about concurrency * 60 / rate seconds
+        ai_logic.GEMINI_QUEUE_TIMEOUT = max(
+            ai_logic.GEMINI_QUEUE_TIMEOUT, 2 * args.concurrency * 60 / rate
+        )
+
+    # aget_feedback uses ai_logic's event loop and HTTP session
+    try:
+        progress = ai_logic.run_sync(grade(args))
+    finally:
+        ai_logic.close_async_client()
+    elapsed = time.monotonic() - progress.started
+    print(
+        f"Done: {progress.graded} graded, {progress.failed} failed, "
+        f"{progress.skipped} skipped in {elapsed:.1f}s "
+        f"({progress.graded / max(elapsed, 1e-9):.2f} answers/s) -> {args.out}"
+        + (f", failures in {failed_file(args.out)}" if progress.failed else ""),
+        file=sys.stderr,
+    )
+    sys.exit(1 if progress.failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from ai_logic import (
+    generate_question,
+    generate_question_plan,
+    stream_feedback,
+    stream_summary,
+    fill_missing_feedback,
+    afill_missing_feedback,
+    agenerate_question,
+    aget_feedback,
+    asummarize_session,
+    gather_sync,
+    run_sync,
+    chain_running_summary,
+    stream_final_summary,
+    prefetch_audio,
+    PRIORITY_PREFETCH,
+    RUNNING_SUMMARY_WAIT,
+    submit_background,
+    record_prefetch,
+    FEEDBACK_FALLBACK,
+    QUESTION_FALLBACK,
+)
+from storage import build_session_record, save_session
+
+STAGE_SETUP = "setup"
+STAGE_INTERVIEW = "interview"
+STAGE_SUMMARY = "summary"
+
+# Plain fields saved by to_dict (background futures are not)
+_STATE_FIELDS = (
+    "role", "interview_type", "level", "total_questions", "resume_text",
+    "job_text", "mode", "plan_mode", "incremental_summary", "stage",
+    "current_index", "current_question", "current_answer", "current_feedback",
+    "qa_list", "overall_summary", "error", "previous_questions", "question_plan",
+    "saved",
+)
+
+
+class InterviewSession:
+    """
+    One candidate's interview, independent of any UI.
+
+    Owns the state machine (setup -> interview -> summary), the prefetched
+    next question, question audio and the rolling summary. The Streamlit app
+    keeps one of these in st.session_state; the benchmark and batch tools
+    drive many of them in one process.
+    """
+
+    def __init__(
+        self,
+        role: str = "",
+        interview_type: str = "Behavioral",
+        level: str = "beginner",
+        total_questions: int = 3,
+        resume_text: str = "",
+        job_text: str = "",
+        mode: str = "Standard mock",
+        plan_mode: bool = False,
+        incremental_summary: bool = False,
+    ):
+        # Settings, chosen during setup
+        self.role = role
+        self.interview_type = interview_type
+        self.level = level
+        self.total_questions = total_questions
+        self.resume_text = resume_text
+        self.job_text = job_text
+        self.mode = mode  # Quick / Standard / Deep
+        self.plan_mode = plan_mode  # all questions generated in one call
+        self.incremental_summary = incremental_summary  # one extra call per answer
+
+        self.stage = STAGE_SETUP
+        self.current_index = 0
+        self.current_question = ""
+        self.current_answer = ""
+        self.current_feedback = ""
+        self.qa_list: List[Dict[str, str]] = []
+        self.overall_summary = ""
+        self.error = ""
+        # Previously asked questions, to avoid repeats
+        self.previous_questions: List[str] = []
+        self.question_plan: List[str] = []
+        # Already appended to the history (save() is then a no-op)
+        self.saved = False
+
+        # Background work: rolling summary, next question, question audio
+        self.running_summary_future = None
+        self.prefetch_future = None
+        self.prefetch_key = None
+        self.audio_future = None
+        self.audio_question = ""
+
+    def reset(self) -> None:
+        """
+        Drop everything and go back to setup with default settings.
+        """
+        self.cancel_prefetch()
+        self.__init__()
+
+    # ---------- Serialization ----------
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        JSON-ready snapshot, so another worker can pick the interview up.
+
+        Pending background work is dropped: a prefetched question is simply
+        regenerated, and rolling notes that are not finished yet make the
+        summary fall back to the full-session prompt.
+        """
+        data = {name: getattr(self, name) for name in _STATE_FIELDS}
+        running = None
+        future = self.running_summary_future
+        if future is not None and future.done() and not future.cancelled():
+            try:
+                running = future.result()
+            except Exception:
+                running = None
+        data["running_summary"] = running
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "InterviewSession":
+        session = cls()
+        for name in _STATE_FIELDS:
+            if name in data:
+                setattr(session, name, data[name])
+        running = data.get("running_summary")
+        if running is not None:
+            future = Future()
+            future.set_result(running)
+            session.running_summary_future = future
+        return session
+
+    # ---------- Prefetch ----------
+
+    def _question_request(self) -> tuple:
+        """
+        Everything generate_question depends on, as a hashable key.
+        """
+        return (
+            self.interview_type,
+            self.role,
+            self.level,
+            self.resume_text,
+            self.job_text,
+            tuple(self.previous_questions),
+        )
+
+    def start_question_audio(self) -> None:
+        """
+        Synthesize audio for the current question in the background.
+        """
+        q = self.current_question
+        self.audio_question = q
+        self.audio_future = prefetch_audio(q) if q else None
+
+    def cancel_prefetch(self) -> None:
+        """
+        Drop any pending prefetched question (reset or settings changed).
+        """
+        future = self.prefetch_future
+        if future is not None:
+            if not future.done():
+                future.cancel()
+            record_prefetch("cancelled")
+        self.prefetch_future = None
+        self.prefetch_key = None
+
+    def schedule_prefetch(self) -> None:
+        """
+        Start generating the next question while the candidate answers this one.
+        """
+        self.cancel_prefetch()
+        if self.current_index >= self.total_questions:
+            return
+        if self.question_plan:
+            # Next question is already planned, only its audio is missing
+            prefetch_audio(self.question_plan[0])
+            return
+
+        key = self._question_request()
+        interview_type, role, level, resume_text, job_text, previous = key
+        self.prefetch_key = key
+        self.prefetch_future = submit_background(
+            _generate_with_audio,
+            interview_type=interview_type,
+            role=role,
+            level=level,
+            resume_text=resume_text,
+            job_text=job_text,
+            previous_questions=list(previous),
+            priority=PRIORITY_PREFETCH,
+        )
+
+    def take_prefetched_question(self) -> Optional[str]:
+        """
+        Return the prefetched question if it still matches the session, else None.
+        """
+        future = self.prefetch_future
+        key = self.prefetch_key
+        self.prefetch_future = None
+        self.prefetch_key = None
+
+        if future is None or key != self._question_request():
+            if future is not None:
+                future.cancel()
+            record_prefetch("misses")
+            return None
+
+        if future.cancel():
+            # Still queued behind other background work: generating inline
+            # is faster than waiting for a pool thread to pick it up
+            record_prefetch("misses")
+            return None
+
+        try:
+            q = future.result()
+        except Exception:
+            record_prefetch("misses")
+            return None
+        if q == QUESTION_FALLBACK:
+            # Prefetch failed (e.g. queue full); retry while the user waits
+            record_prefetch("misses")
+            return None
+
+        record_prefetch("hits")
+        return q
+
+    # ---------- State machine ----------
+
+    def _question_args(self) -> Dict[str, Any]:
+        return dict(
+            interview_type=self.interview_type,
+            role=self.role,
+            level=self.level,
+            resume_text=self.resume_text,
+            job_text=self.job_text,
+            previous_questions=self.previous_questions,
+        )
+
+    def _generate(self) -> str:
+        return generate_question(**self._question_args())
+
+    def _upcoming_question(self) -> str:
+        """
+        The next question: planned, prefetched, or generated on the spot.
+
+        When it has to be generated and the current answer has no feedback
+        yet, both calls go out at once, so the click costs the slower of the
+        two and the summary has one answer less to review.
+        """
+        if self.question_plan:
+            return self.question_plan.pop(0)
+        q = self.take_prefetched_question()
+        if q is not None:
+            return q
+        if self.current_feedback or not self.current_answer.strip():
+            return self._generate()
+
+        feedback, q = gather_sync(
+            aget_feedback(self.current_question, self.current_answer),
+            agenerate_question(**self._question_args()),
+        )
+        if feedback != FEEDBACK_FALLBACK:
+            self.current_feedback = feedback
+        return q
+
+    def _ask(self, q: str) -> None:
+        self.current_question = q
+        self.previous_questions.append(q)
+        self.current_answer = ""
+        self.current_feedback = ""
+        self.start_question_audio()
+        self.schedule_prefetch()
+
+    def start(self) -> None:
+        """
+        Ask the first question and move to the interview stage.
+
+        Raises ValueError without a role; generation errors go to self.error.
+        """
+        if not self.role.strip():
+            raise ValueError("Please enter a target role.")
+
+        try:
+            self.cancel_prefetch()
+            self.error = ""
+            self.current_index = 1
+            self.previous_questions = []
+            self.question_plan = []
+
+            plan = None
+            if self.plan_mode:
+                plan = generate_question_plan(
+                    interview_type=self.interview_type,
+                    role=self.role,
+                    level=self.level,
+                    count=self.total_questions,
+                    resume_text=self.resume_text,
+                    job_text=self.job_text,
+                )
+
+            if plan:
+                q = plan[0]
+                self.question_plan = plan[1:]
+            else:
+                # First question, with no previous questions
+                q = self._generate()
+
+            self.qa_list = []
+            self.overall_summary = ""
+            self.saved = False
+            self.running_summary_future = None
+            self.stage = STAGE_INTERVIEW
+            self._ask(q)
+        except Exception as e:
+            self.error = f"Error starting interview: {e}"
+
+    def save_current_qa(self) -> None:
+        """
+        Record the current answer (if any) and fold it into the rolling summary.
+        """
+        if not self.current_question:
+            return
+        if not self.current_answer.strip():
+            return
+
+        item = {
+            "question": self.current_question,
+            "answer": self.current_answer,
+            "feedback": self.current_feedback,
+        }
+        self.qa_list.append(item)
+
+        if self.incremental_summary:
+            # Chain onto the previous update so answers are folded in order
+            self.running_summary_future = chain_running_summary(
+                self.running_summary_future,
+                self.role,
+                self.interview_type,
+                len(self.qa_list),
+                item,
+            )
+
+    def next_question(self) -> None:
+        """
+        Save the current answer, then ask the next question or finish.
+        """
+        if self.current_index >= self.total_questions:
+            self.save_current_qa()
+            self.cancel_prefetch()
+            self.stage = STAGE_SUMMARY
+            return
+
+        try:
+            self.error = ""
+            # current question is already in previous_questions
+
+            self.current_index += 1
+            try:
+                q = self._upcoming_question()
+            finally:
+                # Saved after, so feedback fetched alongside the question is kept
+                self.save_current_qa()
+            self._ask(q)
+        except Exception as e:
+            self.error = f"Error getting next question: {e}"
+
+    # ---------- Feedback and summary ----------
+
+    def feedback_stream(self):
+        """
+        Yield feedback on the current answer as it arrives; the full text ends
+        up in current_feedback.
+        """
+        self.error = ""
+        chunks = []
+        for chunk in stream_feedback(self.current_question, self.current_answer):
+            chunks.append(chunk)
+            yield chunk
+        self.current_feedback = "".join(chunks)
+
+    def summary_stream(self):
+        """
+        Prepare the overall summary. Returns (stream, filled): a generator of
+        summary chunks (the full text ends up in overall_summary) and whether
+        qa_list got new feedback on the way.
+
+        Waits at most RUNNING_SUMMARY_WAIT seconds for the rolling summary to
+        catch up. Without usable running notes, answers skipped without
+        feedback are reviewed first, in parallel, and the whole session is
+        summarized.
+        """
+        self.error = ""
+        running = self._running_notes()
+        if running is not None:
+            # Notes already cover every answer: only a small final prompt is left
+            chunks = stream_final_summary(
+                role=self.role,
+                interview_type=self.interview_type,
+                running_summary=running["text"],
+                count=running["count"],
+            )
+            return self._collect_summary(chunks), False
+
+        filled = False
+        if not all(item.get("feedback") for item in self.qa_list):
+            self.qa_list = fill_missing_feedback(self.qa_list)
+            filled = True
+
+        chunks = stream_summary(
+            role=self.role,
+            interview_type=self.interview_type,
+            qa_list=self.qa_list,
+        )
+        return self._collect_summary(chunks), filled
+
+    def _running_notes(self) -> Optional[Dict[str, Any]]:
+        """
+        Rolling summary covering every answer, or None if there is none
+        within RUNNING_SUMMARY_WAIT seconds.
+        """
+        future = self.running_summary_future
+        if not self.incremental_summary or future is None:
+            return None
+        try:
+            running = future.result(timeout=RUNNING_SUMMARY_WAIT)
+        except Exception:
+            # Timed out (folds still waiting for tokens) or failed: one
+            # full summary is quicker than waiting for the chain
+            return None
+        if running["text"] and running["count"] == len(self.qa_list):
+            return running
+        return None
+
+    async def _asummarize_all(self):
+        completed = await afill_missing_feedback(self.qa_list)
+        summary = await asummarize_session(self.role, self.interview_type, completed)
+        return completed, summary
+
+    def _collect_summary(self, chunks):
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+        self.overall_summary = "".join(parts)
+
+    def summarize(self) -> str:
+        """
+        Blocking version of summary_stream. Without running notes, missing
+        feedback and the summary run back to back on the async client, with
+        no thread hops in between.
+        """
+        if self._running_notes() is None:
+            self.error = ""
+            self.qa_list, self.overall_summary = run_sync(self._asummarize_all())
+            return self.overall_summary
+        stream, _ = self.summary_stream()
+        for _ in stream:
+            pass
+        return self.overall_summary
+
+    # ---------- History ----------
+
+    def build_record(self) -> Dict[str, Any]:
+        return build_session_record(
+            role=self.role,
+            interview_type=self.interview_type,
+            level=self.level,
+            total_questions=self.total_questions,
+            qa_list=self.qa_list,
+            summary_text=self.overall_summary,
+        )
+
+    def save(self) -> None:
+        """
+        Append this interview to the history, once: repeated calls (retries,
+        double clicks) do not add duplicate records.
+        """
+        if self.saved:
+            return
+        save_session(self.build_record())
+        self.saved = True
+
+
+def _generate_with_audio(**kwargs):
+    """
+    Prefetch job: next question plus its audio, so both are ready on "Next".
+    """
+    q = generate_question(**kwargs)
+    prefetch_audio(q)
+    return q
@@ -0,0 +1,159 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+# Optional JSONL file that receives one line per Gemini call
+METRICS_FILE = os.environ.get("GEMINI_METRICS_FILE", "")
+# Latency histogram buckets (seconds) for the Prometheus export
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+_lock = threading.Lock()
+# Most recent calls, for quick inspection
+RECENT_CALLS: deque = deque(maxlen=500)
+# Aggregates per (kind, status)
+_totals: Dict[tuple, Dict[str, Any]] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)."""
+    return (len(text or "") + 3) // 4
+
+
+def fit_budget(text: str, max_tokens: int, label: str = "text") -> str:
+    """
+    Cut text to about max_tokens, keeping its start and end.
+
+    Used to keep oversized resume/JD/history sections out of prompts.
+    """
+    if not text or max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text
+    keep = max_tokens * 4
+    head = text[: keep * 2 // 3]
+    tail = text[-(keep // 3):]
+    dropped = len(text) - len(head) - len(tail)
+    return f"{head}\n[... {dropped} characters of {label} omitted ...]\n{tail}"
+
+
+def record_call(
+    kind: str,
+    prompt: str,
+    response: str,
+    latency: float,
+    status: str,
+    usage: Optional[Dict[str, Any]] = None,
+) -> None:
+    """
+    Record one Gemini call.
+
+    status is "ok", "cached" or "error"; usage is Gemini's usageMetadata.
+    """
+    usage = usage or {}
+    record = {
+        "ts": round(time.time(), 3),
+        "kind": kind,
+        "status": status,
+        "latency_s": round(latency, 4),
+        "prompt_chars": len(prompt or ""),
+        "prompt_tokens_est": estimate_tokens(prompt),
+        "response_chars": len(response or ""),
+        "prompt_tokens": usage.get("promptTokenCount"),
+        "response_tokens": usage.get("candidatesTokenCount"),
+        "total_tokens": usage.get("totalTokenCount"),
+    }
+
+    with _lock:
+        RECENT_CALLS.append(record)
+        totals = _totals.setdefault(
+            (kind, status),
+            {
+                "count": 0,
+                "latency_sum": 0.0,
+                "prompt_chars": 0,
+                "response_chars": 0,
+                "prompt_tokens": 0,
+                "response_tokens": 0,
+                "buckets": [0] * len(LATENCY_BUCKETS),
+            },
+        )
+        totals["count"] += 1
+        totals["latency_sum"] += latency
+        totals["prompt_chars"] += record["prompt_chars"]
+        totals["response_chars"] += record["response_chars"]
+        totals["prompt_tokens"] += record["prompt_tokens"] or record["prompt_tokens_est"]
+        totals["response_tokens"] += record["response_tokens"] or 0
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                totals["buckets"][i] += 1
+
+        if METRICS_FILE:
+            try:
+                with open(METRICS_FILE, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError:
+                pass
+
+
+def summary() -> Dict[str, Dict[str, Any]]:
+    """Per-kind counts, average latency and prompt size."""
+    out: Dict[str, Dict[str, Any]] = {}
+    with _lock:
+        for (kind, status), t in _totals.items():
+            row = out.setdefault(kind, {"calls": 0, "errors": 0, "cached": 0, "latency_sum": 0.0, "prompt_tokens": 0})
+            row["calls"] += t["count"]
+            row["latency_sum"] += t["latency_sum"]
+            row["prompt_tokens"] += t["prompt_tokens"]
+            if status == "error":
+                row["errors"] += t["count"]
+            if status == "cached":
+                row["cached"] += t["count"]
+    for row in out.values():
+        row["avg_latency_s"] = row.pop("latency_sum") / row["calls"] if row["calls"] else 0.0
+        row["avg_prompt_tokens"] = row.pop("prompt_tokens") / row["calls"] if row["calls"] else 0.0
+    return out
+
+
+def export_prometheus() -> str:
+    """All aggregates in the Prometheus text exposition format."""
+    lines = [
+        "# HELP gemini_calls_total Gemini calls by kind and status.",
+        "# TYPE gemini_calls_total counter",
+    ]
+    with _lock:
+        items = sorted(_totals.items())
+        for (kind, status), t in items:
+            lines.append(f'gemini_calls_total{{kind="{kind}",status="{status}"}} {t["count"]}')
+
+        for name, field, help_text in (
+            ("gemini_prompt_chars_total", "prompt_chars", "Prompt characters sent."),
+            ("gemini_response_chars_total", "response_chars", "Response characters received."),
+            ("gemini_prompt_tokens_total", "prompt_tokens", "Prompt tokens (reported, else estimated)."),
+            ("gemini_response_tokens_total", "response_tokens", "Response tokens reported by Gemini."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (kind, status), t in items:
+                lines.append(f'{name}{{kind="{kind}",status="{status}"}} {t[field]}')
+
+        lines.append("# HELP gemini_latency_seconds Gemini call latency.")
+        lines.append("# TYPE gemini_latency_seconds histogram")
+        for (kind, status), t in items:
+            labels = f'kind="{kind}",status="{status}"'
+            for bound, count in zip(LATENCY_BUCKETS, t["buckets"]):
+                lines.append(f'gemini_latency_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'gemini_latency_seconds_bucket{{{labels},le="+Inf"}} {t["count"]}')
+            lines.append(f"gemini_latency_seconds_sum{{{labels}}} {t['latency_sum']:.6f}")
+            lines.append(f"gemini_latency_seconds_count{{{labels}}} {t['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def export_jsonl(path: str) -> int:
+    """Write the recent call records to a JSONL file; returns lines written."""
+    with _lock:
+        records = list(RECENT_CALLS)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    return len(records)
@@ -0,0 +1,189 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from question_dedup import DUPLICATE_THRESHOLD, QuestionIndex, normalize
+from storage import iter_history
+
+# Questions kept per (interview type, role, level), served before calling Gemini
+QUESTION_BANK_DB = Path(os.environ.get("QUESTION_BANK_DB", "question_bank.db"))
+# Similarity at which a question counts as already banked; ai_logic sets this
+# from its DEDUP_THRESHOLD setting so banking and generation agree
+duplicate_threshold = DUPLICATE_THRESHOLD
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    interview_type TEXT NOT NULL,
+    role_key TEXT NOT NULL,
+    level TEXT NOT NULL,
+    question TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created REAL NOT NULL,
+    UNIQUE (interview_type, role_key, level, question)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_key
+    ON questions(interview_type, role_key, level);
+"""
+
+BankKey = Tuple[str, str, str]
+
+# In-memory index: key -> (question, normalized question) pairs, loaded once
+# from SQLite; normalized once here so lookups only compare strings
+_index: Optional[Dict[BankKey, List[Tuple[str, str]]]] = None
+_lock = threading.Lock()
+BANK_STATS = {"hits": 0, "misses": 0, "added": 0, "rejected_duplicates": 0}
+
+
+def bank_key(interview_type: str, role: str, level: str) -> BankKey:
+    """Key questions by type, normalized role and level."""
+    return (interview_type, normalize(role or ""), level)
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(QUESTION_BANK_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _load_index() -> Dict[BankKey, List[Tuple[str, str]]]:
+    """Load the bank into memory, seeding it from history the first time."""
+    global _index
+    if _index is not None:
+        return _index
+
+    conn = _connect()
+    try:
+        empty = conn.execute("SELECT 1 FROM questions LIMIT 1").fetchone() is None
+    finally:
+        conn.close()
+    if empty:
+        _seed_from_history()
+
+    index: Dict[BankKey, List[Tuple[str, str]]] = {}
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT interview_type, role_key, level, question FROM questions"
+            " ORDER BY id"
+        )
+        for interview_type, role_key, level, question in rows:
+            index.setdefault((interview_type, role_key, level), []).append(
+                (question, normalize(question))
+            )
+    finally:
+        conn.close()
+    _index = index
+    return _index
+
+
+def _insert(key: BankKey, questions: Iterable[str], source: str) -> int:
+    """Add questions that are not near-duplicates of ones already banked."""
+    existing = (_index or {}).get(key, [])
+    dedup = QuestionIndex(q for q, _ in existing)
+    fresh = []
+    for q in questions:
+        q = (q or "").strip()
+        if not q:
+            continue
+        if dedup.is_duplicate(q, duplicate_threshold):
+            BANK_STATS["rejected_duplicates"] += 1
+            continue
+        dedup.add(q)
+        fresh.append(q)
+    if not fresh:
+        return 0
+
+    added = []
+    conn = _connect()
+    try:
+        with conn:
+            for q in fresh:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO questions"
+                    " (interview_type, role_key, level, question, source, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, q, source, time.time()),
+                )
+                if cur.rowcount:
+                    added.append(q)
+    finally:
+        conn.close()
+
+    if _index is not None:
+        _index.setdefault(key, []).extend((q, normalize(q)) for q in added)
+    BANK_STATS["added"] += len(added)
+    return len(added)
+
+
+def _seed_from_history() -> None:
+    grouped: Dict[BankKey, List[str]] = {}
+    for session in iter_history():
+        key = bank_key(
+            session.get("interview_type", ""),
+            session.get("role", ""),
+            session.get("level", ""),
+        )
+        for item in session.get("qa_list", []):
+            grouped.setdefault(key, []).append(item.get("question", ""))
+    for key, questions in grouped.items():
+        _insert(key, questions, "history")
+
+
+def add_questions(
+    interview_type: str, role: str, level: str, questions: Iterable[str], source: str
+) -> int:
+    """Bank new questions; returns how many were actually added."""
+    key = bank_key(interview_type, role, level)
+    with _lock:
+        _load_index()
+        return _insert(key, questions, source)
+
+
+def take_question(
+    interview_type: str,
+    role: str,
+    level: str,
+    exclude: Iterable[str] = (),
+    avoid: Iterable[str] = (),
+) -> Optional[str]:
+    """
+    A banked question not in `exclude` (compared after normalizing), or None.
+    Questions in `avoid` are only served when nothing else is left.
+
+    This is a dict lookup plus a set filter, so it costs well under a
+    millisecond once the bank is loaded.
+    """
+    key = bank_key(interview_type, role, level)
+    excluded = {normalize(q) for q in exclude}
+    avoided = {normalize(q) for q in avoid}
+    with _lock:
+        candidates = [
+            (q, norm) for q, norm in _load_index().get(key, []) if norm not in excluded
+        ]
+        if not candidates:
+            BANK_STATS["misses"] += 1
+            return None
+        BANK_STATS["hits"] += 1
+    fresh = [q for q, norm in candidates if norm not in avoided]
+    return random.choice(fresh or [q for q, _ in candidates])
+
+
+def available(interview_type: str, role: str, level: str, exclude: Iterable[str] = ()) -> int:
+    """How many banked questions are left for this key after `exclude`."""
+    key = bank_key(interview_type, role, level)
+    excluded = {normalize(q) for q in exclude}
+    with _lock:
+        return sum(1 for _, norm in _load_index().get(key, []) if norm not in excluded)
+
+
+def bank_stats() -> dict:
+    """Hit/miss counters and size of the question bank."""
+    with _lock:
+        size = sum(len(qs) for qs in (_index or {}).values())
+        return {**BANK_STATS, "questions": size}
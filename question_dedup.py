@@ -0,0 +1,104 @@
+import re
+import zlib
+from collections import Counter
+from functools import lru_cache
+from typing import Iterable, List
+
+import numpy as np
+
+# Size of the hashed feature space (collisions are rare enough at this size)
+VECTOR_DIM = 4096
+# Cosine similarity at or above which two questions count as the same
+DUPLICATE_THRESHOLD = 0.8
+
+_STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "can", "could", "describe",
+    "did", "do", "does", "for", "from", "give", "had", "have", "how", "if", "in",
+    "is", "it", "me", "of", "on", "or", "example", "tell", "that", "the", "this",
+    "time", "to", "was", "what", "when", "where", "which", "while", "who", "why",
+    "with", "would", "you", "your", "yourself", "walk", "through", "explain",
+}
+
+
+def normalize(text: str) -> str:
+    """Lowercase words without punctuation, single-spaced."""
+    return " ".join(re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split())
+
+
+def _features(text: str) -> List[str]:
+    """Word unigrams/bigrams plus character trigrams of the normalized text."""
+    norm = normalize(text)
+    words = norm.split()
+    features = [f"w:{w}" for w in words if w not in _STOPWORDS]
+    features += [f"b:{a} {b}" for a, b in zip(words, words[1:])]
+    padded = f" {norm} "
+    features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    return features
+
+
+@lru_cache(maxsize=4096)
+def vectorize(text: str) -> np.ndarray:
+    """L2-normalized hashed n-gram vector of a question (read-only)."""
+    vec = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for feature in _features(text):
+        vec[zlib.crc32(feature.encode("utf-8")) % VECTOR_DIM] += 1.0
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    vec.flags.writeable = False
+    return vec
+
+
+class QuestionIndex:
+    """Similarity lookups against a set of already asked questions."""
+
+    def __init__(self, questions: Iterable[str] = ()):
+        self.questions: List[str] = [q for q in questions if q]
+        self._matrix = None
+
+    def add(self, question: str) -> None:
+        if not question:
+            return
+        self.questions.append(question)
+        # Rebuilt lazily, so adding many questions stays linear
+        self._matrix = None
+
+    def similarities(self, question: str) -> np.ndarray:
+        if not self.questions:
+            return np.zeros(0, dtype=np.float32)
+        if self._matrix is None:
+            self._matrix = np.stack([vectorize(q) for q in self.questions])
+        return self._matrix @ vectorize(question)
+
+    def closest(self, question: str):
+        """(most similar known question, cosine similarity) or (None, 0.0)."""
+        sims = self.similarities(question)
+        if not sims.size:
+            return None, 0.0
+        i = int(np.argmax(sims))
+        return self.questions[i], float(sims[i])
+
+    def is_duplicate(self, question: str, threshold: float = DUPLICATE_THRESHOLD) -> bool:
+        return self.closest(question)[1] >= threshold
+
+
+def topic_digest(questions: Iterable[str], max_topics: int = 12, words_per_topic: int = 3) -> str:
+    """
+    Compact list of topics already covered, one short keyword phrase per
+    question (most recent first), so the prompt stays bounded.
+    """
+    topics = []
+    seen = set()
+    for q in reversed(list(questions)):
+        words = [w for w in normalize(q).split() if w not in _STOPWORDS and len(w) > 2]
+        if not words:
+            continue
+        top = [w for w, _ in Counter(words).most_common(words_per_topic)]
+        topic = " ".join(top)
+        if topic in seen:
+            continue
+        seen.add(topic)
+        topics.append(topic)
+        if len(topics) >= max_topics:
+            break
+    return "; ".join(topics)
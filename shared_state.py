@@ -0,0 +1,170 @@
+"""
+State shared by several app/API worker processes.
+
+A store is any object with get(key) -> Optional[bytes], put(key, value, ttl)
+and delete(key). Two are provided:
+
+    sqlite:///path/to/state.db   one SQLite file (WAL); all processes on a host
+    redis://host:6379/0          Redis (needs the `redis` package); many hosts
+
+It backs in-progress interviews (SessionStore, used by api_server.py), the
+Gemini response cache (RESPONSE_CACHE_BACKEND="shared") and the question
+audio cache (TTS_CACHE_BACKEND="shared"); see SHARED_STATE_URL in ai_logic.
+
+History does not go through here: both storage backends already lock across
+processes (flock'd JSONL appends, SQLite WAL), so workers on one host can
+share HISTORY_FILE / HISTORY_DB. Several hosts need them on shared storage
+and HISTORY_SHARED=1; with a redis:// store and without it, ai_logic refuses
+to start rather than let each host keep its own history (history ids are
+byte offsets / row ids into the local file). The question bank is a per-host
+cache and needs no sharing.
+
+The Gemini rate limit, concurrency limit and circuit breaker do not go
+through here either; each process has its own, so divide the quota between
+workers (GEMINI_RATE_PER_MINUTE = quota / number of workers).
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+);
+CREATE INDEX IF NOT EXISTS idx_kv_expires ON kv(expires);
+"""
+
+
+class SQLiteStateStore:
+    """Key/value store with expiry in one SQLite file, one connection per thread."""
+
+    multi_host = False
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._puts = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value FROM kv WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        expires = time.time() + ttl if ttl else None
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, expires),
+            )
+        self._puts += 1
+        # Expired rows are skipped by get(); delete them now and then
+        if self._puts % 256 == 0:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (time.time(),)
+            )
+        return cur.rowcount
+
+
+class RedisStateStore:
+    """Same interface on Redis, for workers on several hosts."""
+
+    multi_host = True
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SHARED_STATE_URL is a redis:// URL but `redis` is not installed")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def put(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._client.set(key, value, px=int(ttl * 1000) if ttl else None)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(key)
+
+
+def open_store(url: str):
+    """Store for a sqlite:/// or redis:// URL; None for an empty URL."""
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteStateStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStateStore(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+_stores: Dict[str, Any] = {}
+_stores_lock = threading.Lock()
+
+
+def get_store(url: str):
+    """One store object per URL in this process."""
+    if not url:
+        return None
+    with _stores_lock:
+        if url not in _stores:
+            _stores[url] = open_store(url)
+        return _stores[url]
+
+
+# ---------- In-progress interviews ----------
+
+class SessionStore:
+    """
+    Interviews as JSON under "session:<id>", each with a version number.
+
+    Concurrent writes to the same interview from two workers are last write
+    wins; clients drive one interview with one request at a time anyway.
+    """
+
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+
+    def load(self, session_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """(version, session dict) or None if unknown/expired."""
+        raw = self.store.get(f"session:{session_id}")
+        if raw is None:
+            return None
+        item = json.loads(raw)
+        return item["version"], item["session"]
+
+    def save(self, session_id: str, version: int, session: Dict[str, Any]) -> None:
+        data = json.dumps({"version": version, "session": session}, ensure_ascii=False)
+        self.store.put(f"session:{session_id}", data.encode("utf-8"), self.ttl)
+
+    def delete(self, session_id: str) -> None:
+        self.store.delete(f"session:{session_id}")
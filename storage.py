@@ -1,33 +1,517 @@
 import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 
-HISTORY_FILE = Path("interview_history.json")
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
+# One JSON object per line, appended atomically
+HISTORY_FILE = Path("interview_history.jsonl")
+# Old format: one JSON array rewritten on every save
+LEGACY_HISTORY_FILE = Path("interview_history.json")
 
-def load_history() -> List[Dict[str, Any]]:
-    """Load all past interview sessions from JSON file."""
-    if not HISTORY_FILE.exists():
-        return []
+# "jsonl" (default) or "sqlite"
+HISTORY_BACKEND = os.environ.get("HISTORY_BACKEND", "jsonl")
+HISTORY_DB = Path(os.environ.get("HISTORY_DB", "interview_history.db"))
+
+HEADER_FIELDS = ("timestamp", "role", "interview_type", "level", "total_questions")
+
+
+@contextmanager
+def _locked(f):
+    """Hold an exclusive lock on an open file (blocks other writers)."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _migrate_legacy_history() -> None:
+    """One-time copy of the old JSON array into the JSONL file."""
+    if HISTORY_FILE.exists() or not LEGACY_HISTORY_FILE.exists():
+        return
 
     try:
-        with HISTORY_FILE.open("r", encoding="utf-8") as f:
+        with LEGACY_HISTORY_FILE.open("r", encoding="utf-8") as f:
             data = json.load(f)
-        if isinstance(data, list):
-            return data
-        return []
     except Exception:
-        return []
+        return
+    if not isinstance(data, list):
+        return
+
+    # Write to a temp file and rename, so a crash never leaves half a file
+    fd, tmp_name = tempfile.mkstemp(
+        dir=HISTORY_FILE.parent, prefix=HISTORY_FILE.name, suffix=".tmp"
+    )
+    tmp = Path(tmp_name)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for session in data:
+            f.write(json.dumps(session, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    try:
+        # Another process may have migrated in the meantime; keep theirs
+        os.link(tmp, HISTORY_FILE)
+    except FileExistsError:
+        pass
+    except OSError:
+        if not HISTORY_FILE.exists():
+            os.replace(tmp, HISTORY_FILE)
+    if tmp.exists():
+        tmp.unlink()
+
+
+def _iter_jsonl() -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yield (byte offset, session) for each line of the JSONL file."""
+    _migrate_legacy_history()
+    if not HISTORY_FILE.exists():
+        return
+
+    with HISTORY_FILE.open("rb") as f:
+        offset = 0
+        for line in f:
+            start = offset
+            offset += len(line)
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                session = json.loads(line)
+            except ValueError:
+                # Skip a torn or corrupt line instead of losing everything
+                continue
+            if isinstance(session, dict):
+                yield start, session
+
+
+# Parsed JSONL history shared by every session in this process. Keyed on the
+# file's (inode, mtime, size); appends are parsed incrementally.
+_cache_lock = threading.Lock()
+_cache: Dict[str, Any] = {"stamp": None, "end": 0, "sessions": [], "headers": []}
+HISTORY_CACHE_STATS = {"hits": 0, "full_loads": 0, "incremental_loads": 0, "invalidations": 0}
+
+
+def _header(offset: int, session: Dict[str, Any]) -> Dict[str, Any]:
+    header = {field: session.get(field) for field in HEADER_FIELDS}
+    header["id"] = offset
+    header["score"] = extract_score(session.get("summary", ""))
+    return header
+
+
+def _read_jsonl_from(start: int) -> Tuple[List[Tuple[int, Dict[str, Any]]], int]:
+    """Parse complete lines from byte `start`; return (entries, end offset)."""
+    entries = []
+    end = start
+    with HISTORY_FILE.open("rb") as f:
+        f.seek(start)
+        for line in f:
+            if not line.endswith(b"\n"):
+                # A write in progress; pick it up next time
+                break
+            offset = end
+            end += len(line)
+            try:
+                session = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(session, dict):
+                entries.append((offset, session))
+    return entries, end
+
+
+def _cached_history() -> Dict[str, Any]:
+    """Parsed sessions and newest-first headers, refreshed only on change."""
+    _migrate_legacy_history()
+    try:
+        st = HISTORY_FILE.stat()
+    except OSError:
+        return {"sessions": [], "headers": []}
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    with _cache_lock:
+        if _cache["stamp"] == stamp:
+            HISTORY_CACHE_STATS["hits"] += 1
+            return _cache
+
+        old = _cache["stamp"]
+        if old is not None and old[0] == st.st_ino and st.st_size >= _cache["end"]:
+            entries, end = _read_jsonl_from(_cache["end"])
+            sessions = _cache["sessions"] + [s for _, s in entries]
+            headers = [_header(o, s) for o, s in reversed(entries)] + _cache["headers"]
+            HISTORY_CACHE_STATS["incremental_loads"] += 1
+        else:
+            entries, end = _read_jsonl_from(0)
+            sessions = [s for _, s in entries]
+            headers = sorted(
+                (_header(o, s) for o, s in entries),
+                key=lambda h: (h["timestamp"] or "", h["id"]),
+                reverse=True,
+            )
+            HISTORY_CACHE_STATS["full_loads"] += 1
+
+        _cache.update(stamp=stamp, end=end, sessions=sessions, headers=headers)
+        return _cache
+
+
+def history_cache_stats() -> Dict[str, Any]:
+    """Counters for the in-process history cache."""
+    with _cache_lock:
+        stats = dict(HISTORY_CACHE_STATS)
+        stats["sessions"] = len(_cache["sessions"])
+    lookups = stats["hits"] + stats["full_loads"] + stats["incremental_loads"]
+    stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+    return stats
+
+
+def _append_jsonl(session: Dict[str, Any]) -> None:
+    _migrate_legacy_history()
+    line = (json.dumps(session, ensure_ascii=False) + "\n").encode("utf-8")
+
+    with HISTORY_FILE.open("ab") as f:
+        with _locked(f):
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # Force a stat check on the next read even if mtime resolution is coarse
+    with _cache_lock:
+        if _cache["stamp"] is not None:
+            _cache["stamp"] = (_cache["stamp"][0], None, None)
+            HISTORY_CACHE_STATS["invalidations"] += 1
+
+
+# ---------- SQLite backend ----------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp TEXT NOT NULL,
+    role TEXT NOT NULL COLLATE NOCASE,
+    interview_type TEXT NOT NULL,
+    level TEXT NOT NULL,
+    total_questions INTEGER NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    score REAL
+);
+CREATE TABLE IF NOT EXISTS qa_items (
+    session_id INTEGER NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    feedback TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (session_id, position)
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions(timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_role ON sessions(role, timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_type ON sessions(interview_type, timestamp);
+CREATE INDEX IF NOT EXISTS idx_sessions_level ON sessions(level, timestamp);
+"""
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def _db() -> sqlite3.Connection:
+    """One connection per thread; schema is created on first use."""
+    global _schema_ready
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(HISTORY_DB, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        _local.conn = conn
+
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                conn.executescript(_SCHEMA)
+                empty = conn.execute("SELECT 1 FROM sessions LIMIT 1").fetchone() is None
+                _schema_ready = True
+                if empty:
+                    import_json_history()
+    return conn
+
+
+def _insert_session(conn: sqlite3.Connection, session: Dict[str, Any]) -> int:
+    cur = conn.execute(
+        "INSERT INTO sessions (timestamp, role, interview_type, level,"
+        " total_questions, summary, score) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (
+            session.get("timestamp", ""),
+            session.get("role", ""),
+            session.get("interview_type", ""),
+            session.get("level", ""),
+            session.get("total_questions", 0),
+            session.get("summary", ""),
+            extract_score(session.get("summary", "")),
+        ),
+    )
+    session_id = cur.lastrowid
+    conn.executemany(
+        "INSERT INTO qa_items (session_id, position, question, answer, feedback)"
+        " VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                session_id,
+                i,
+                item.get("question", ""),
+                item.get("answer", ""),
+                item.get("feedback", ""),
+            )
+            for i, item in enumerate(session.get("qa_list", []))
+        ],
+    )
+    return session_id
+
+
+def _session_from_row(conn: sqlite3.Connection, row: sqlite3.Row) -> Dict[str, Any]:
+    items = conn.execute(
+        "SELECT question, answer, feedback FROM qa_items"
+        " WHERE session_id = ? ORDER BY position",
+        (row["id"],),
+    ).fetchall()
+    return {
+        "id": row["id"],
+        **{field: row[field] for field in HEADER_FIELDS},
+        "qa_list": [dict(item) for item in items],
+        "summary": row["summary"],
+    }
+
+
+def import_json_history(path: Optional[Path] = None) -> int:
+    """
+    Copy sessions from a JSON array or JSONL file into the SQLite database.
+
+    Sessions already present (same timestamp, role and type) are skipped.
+    Returns the number of sessions imported.
+    """
+    if path is None:
+        path = HISTORY_FILE if HISTORY_FILE.exists() else LEGACY_HISTORY_FILE
+    path = Path(path)
+    if not path.exists():
+        return 0
+
+    with path.open("r", encoding="utf-8") as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+        sessions = data if isinstance(data, list) else []
+    except ValueError:
+        sessions = []
+        for line in text.splitlines():
+            try:
+                sessions.append(json.loads(line))
+            except ValueError:
+                continue
+
+    conn = _db()
+    imported = 0
+    with conn:
+        for session in sessions:
+            if not isinstance(session, dict):
+                continue
+            exists = conn.execute(
+                "SELECT 1 FROM sessions WHERE timestamp = ? AND role = ?"
+                " AND interview_type = ?",
+                (
+                    session.get("timestamp", ""),
+                    session.get("role", ""),
+                    session.get("interview_type", ""),
+                ),
+            ).fetchone()
+            if exists:
+                continue
+            _insert_session(conn, session)
+            imported += 1
+    return imported
+
+
+# ---------- Public API ----------
+
+def iter_history() -> Iterator[Dict[str, Any]]:
+    """Stream past interview sessions, oldest first."""
+    if HISTORY_BACKEND == "sqlite":
+        conn = _db()
+        for row in conn.execute("SELECT * FROM sessions ORDER BY timestamp, id"):
+            yield _session_from_row(conn, row)
+        return
+
+    for _, session in _iter_jsonl():
+        yield session
+
+
+def load_history() -> List[Dict[str, Any]]:
+    """
+    Load all past interview sessions.
+
+    With the JSONL backend this is served from an in-process cache; treat the
+    returned dicts as read-only.
+    """
+    if HISTORY_BACKEND == "sqlite":
+        return list(iter_history())
+    return list(_cached_history()["sessions"])
 
 
 def save_session(session: Dict[str, Any]) -> None:
-    """Append one session to the JSON history file."""
-    history = load_history()
-    history.append(session)
+    """Append one session to the history store."""
+    if HISTORY_BACKEND == "sqlite":
+        conn = _db()
+        with conn:
+            _insert_session(conn, session)
+        return
+
+    _append_jsonl(session)
+
+
+def query_sessions(
+    role: Optional[str] = None,
+    interview_type: Optional[str] = None,
+    level: Optional[str] = None,
+    page: int = 1,
+    page_size: int = 20,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    One page of session headers (no Q&A bodies), newest first.
 
-    with HISTORY_FILE.open("w", encoding="utf-8") as f:
-        json.dump(history, f, ensure_ascii=False, indent=2)
+    Returns (headers, total matching sessions). Each header has an "id"
+    that can be passed to get_session().
+    """
+    page = max(page, 1)
+
+    if HISTORY_BACKEND == "sqlite":
+        where = []
+        args: List[Any] = []
+        for column, value in (
+            ("role", role),
+            ("interview_type", interview_type),
+            ("level", level),
+        ):
+            if value:
+                where.append(f"{column} = ?")
+                args.append(value)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        conn = _db()
+        total = conn.execute(
+            f"SELECT COUNT(*) FROM sessions {clause}", args
+        ).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT id, timestamp, role, interview_type, level, total_questions,"
+            f" score FROM sessions {clause}"
+            f" ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?",
+            args + [page_size, (page - 1) * page_size],
+        ).fetchall()
+        return [dict(row) for row in rows], total
+
+    headers = _cached_history()["headers"]
+    if role or interview_type or level:
+        headers = [
+            h for h in headers
+            if (not role or (h["role"] or "").lower() == role.lower())
+            and (not interview_type or h["interview_type"] == interview_type)
+            and (not level or h["level"] == level)
+        ]
+    start = (page - 1) * page_size
+    return [dict(h) for h in headers[start:start + page_size]], len(headers)
+
+
+def get_session(session_id: int) -> Optional[Dict[str, Any]]:
+    """Full session (with Q&A) for an id returned by query_sessions()."""
+    if HISTORY_BACKEND == "sqlite":
+        conn = _db()
+        row = conn.execute(
+            "SELECT * FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return _session_from_row(conn, row) if row else None
+
+    # JSONL ids are byte offsets, so this is a single seek
+    try:
+        with HISTORY_FILE.open("rb") as f:
+            f.seek(session_id)
+            session = json.loads(f.readline())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(session, dict):
+        return None
+    session["id"] = session_id
+    return session
+
+
+def past_questions(role: str, limit: int = 200) -> List[str]:
+    """Questions asked in saved sessions for this role, most recent first."""
+    if not role:
+        return []
+
+    if HISTORY_BACKEND == "sqlite":
+        rows = _db().execute(
+            "SELECT q.question FROM sessions s JOIN qa_items q ON q.session_id = s.id"
+            " WHERE s.role = ? ORDER BY s.timestamp DESC, s.id DESC, q.position"
+            " LIMIT ?",
+            (role, limit),
+        )
+        return [row[0] for row in rows]
+
+    questions = []
+    for session in reversed(_cached_history()["sessions"]):
+        if (session.get("role") or "").lower() != role.lower():
+            continue
+        for item in session.get("qa_list", []):
+            if item.get("question"):
+                questions.append(item["question"])
+        if len(questions) >= limit:
+            break
+    return questions[:limit]
+
+
+def list_roles() -> List[str]:
+    """Distinct roles in the history, for filter widgets."""
+    if HISTORY_BACKEND == "sqlite":
+        rows = _db().execute("SELECT DISTINCT role FROM sessions ORDER BY role")
+        return [row[0] for row in rows]
+
+    headers = _cached_history()["headers"]
+    return sorted({h["role"] for h in headers if h["role"]})
+
+
+_SCORE_RE = re.compile(
+    r"overall\s+score[^0-9]{0,20}(\d+(?:\.\d+)?)\s*(?:/\s*(\d+))?",
+    re.IGNORECASE,
+)
+
+
+def extract_score(summary: str) -> Optional[float]:
+    """Best-effort overall score (out of 10) from a summary text."""
+    match = _SCORE_RE.search(summary or "")
+    if not match:
+        return None
+    score = float(match.group(1))
+    scale = float(match.group(2)) if match.group(2) else 10.0
+    if scale <= 0:
+        return None
+    return round(score * 10.0 / scale, 1)
 
 
 def build_session_record(
@@ -49,3 +533,10 @@ def build_session_record(
         "summary": summary_text,
     }
 
+
+if __name__ == "__main__":
+    # python storage.py [path]  ->  import a JSON/JSONL history into SQLite
+    import sys
+
+    source = Path(sys.argv[1]) if len(sys.argv) > 1 else None
+    print(f"Imported {import_json_history(source)} sessions into {HISTORY_DB}")
@@ -0,0 +1,183 @@
+"""
+Retries, Retry-After, the circuit breaker and the concurrency limit of the
+Gemini client, against the local fake server (no network, no API key).
+
+    python -m pytest -q test_gemini_client.py
+"""
+import importlib
+import os
+import threading
+import time
+
+import pytest
+
+from fake_gemini import FakeConfig, start_fake_server
+
+
+@pytest.fixture(scope="module")
+def ai_logic(tmp_path_factory):
+    # Settings are read when ai_logic is imported, so set them first
+    tmp = tmp_path_factory.mktemp("gemini")
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in {
+            "GEMINI_API_KEY": "fake",
+            "GEMINI_RATE_PER_MINUTE": "0",
+            "RESPONSE_CACHE_BACKEND": "none",
+            "QUESTION_BANK_ENABLED": "false",
+            "TTS_CACHE_DIR": str(tmp / "tts"),
+            "GEMINI_METRICS_FILE": "",
+        }.items():
+            mp.setenv(name, value)
+        yield importlib.import_module("ai_logic")
+
+
+@pytest.fixture
+def fake(ai_logic, monkeypatch):
+    """
+    fake(**FakeConfig fields) starts a fake server and points ai_logic at it,
+    with a fresh breaker, limiter and counters and near-zero backoff.
+    """
+    monkeypatch.setattr(ai_logic, "_breaker", ai_logic.CircuitBreaker(3, 30))
+    monkeypatch.setattr(ai_logic, "_limiter", threading.BoundedSemaphore(8))
+    monkeypatch.setattr(ai_logic, "GEMINI_MAX_RETRIES", 3)
+    monkeypatch.setattr(ai_logic, "GEMINI_BACKOFF_MAX", 0.01)
+    for name in ai_logic.GEMINI_STATS:
+        monkeypatch.setitem(ai_logic.GEMINI_STATS, name, 0)
+
+    servers = []
+
+    def start(**config):
+        config.setdefault("latency", 0.01)
+        config.setdefault("jitter", 0.0)
+        server, base_url = start_fake_server(FakeConfig(**config))
+        servers.append(server)
+        monkeypatch.setattr(
+            ai_logic, "GEMINI_URL", f"{base_url}/v1beta/models/fake:generateContent"
+        )
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_retries_503_then_succeeds(ai_logic, fake):
+    server = fake(fail_first=2)
+
+    text = ai_logic._call_gemini("Give feedback")
+
+    assert text.startswith("Overall score")
+    assert server.stats["generate"] == 3
+    stats = ai_logic.gemini_stats()
+    assert stats["requests"] == 3
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+    assert stats["in_flight"] == 0
+    assert stats["breaker_state"] == "closed"
+
+
+def test_waits_for_retry_after(ai_logic, fake):
+    fake(fail_first=1, retry_after=0.5)
+
+    start = time.monotonic()
+    ai_logic._call_gemini("Give feedback")
+
+    # Backoff alone is capped at 0.01 s here
+    assert time.monotonic() - start >= 0.5
+    assert ai_logic.gemini_stats()["retries"] == 1
+
+
+def test_gives_up_after_max_retries(ai_logic, fake, monkeypatch):
+    monkeypatch.setattr(ai_logic, "_breaker", ai_logic.CircuitBreaker(100, 30))
+    server = fake(error_rate=1.0)
+
+    with pytest.raises(RuntimeError, match="503"):
+        ai_logic._call_gemini("Give feedback")
+
+    assert server.stats["generate"] == ai_logic.GEMINI_MAX_RETRIES + 1
+    stats = ai_logic.gemini_stats()
+    assert stats["retries"] == ai_logic.GEMINI_MAX_RETRIES
+    assert stats["failures"] == 1
+
+
+def test_breaker_opens_and_fails_fast(ai_logic, fake, monkeypatch):
+    monkeypatch.setattr(ai_logic, "GEMINI_MAX_RETRIES", 1)
+    monkeypatch.setattr(ai_logic, "_breaker", ai_logic.CircuitBreaker(2, 30))
+    server = fake(error_rate=1.0)
+
+    with pytest.raises(RuntimeError):
+        ai_logic._call_gemini("Give feedback")
+    assert ai_logic.gemini_stats()["breaker_state"] == "open"
+
+    sent = server.stats["generate"]
+    with pytest.raises(ai_logic.GeminiUnavailable):
+        ai_logic._call_gemini("Give feedback")
+
+    assert server.stats["generate"] == sent
+    stats = ai_logic.gemini_stats()
+    assert stats["breaker_trips"] == 1
+    assert stats["breaker_rejections"] == 1
+
+
+def test_half_open_probe_closes_breaker(ai_logic, fake, monkeypatch):
+    monkeypatch.setattr(ai_logic, "GEMINI_MAX_RETRIES", 0)
+    monkeypatch.setattr(ai_logic, "_breaker", ai_logic.CircuitBreaker(1, 0.2))
+    server = fake(error_rate=1.0)
+
+    with pytest.raises(RuntimeError):
+        ai_logic._call_gemini("Give feedback")
+    assert ai_logic.gemini_stats()["breaker_state"] == "open"
+
+    server.RequestHandlerClass.config.error_rate = 0.0
+    time.sleep(0.25)
+    assert ai_logic._call_gemini("Give feedback")
+    assert ai_logic.gemini_stats()["breaker_state"] == "closed"
+
+
+def test_failed_probe_reopens_breaker(ai_logic, fake, monkeypatch):
+    monkeypatch.setattr(ai_logic, "GEMINI_MAX_RETRIES", 0)
+    monkeypatch.setattr(ai_logic, "_breaker", ai_logic.CircuitBreaker(1, 0.2))
+    fake(error_rate=1.0)
+
+    with pytest.raises(RuntimeError):
+        ai_logic._call_gemini("Give feedback")
+    time.sleep(0.25)
+    with pytest.raises(RuntimeError, match="503"):
+        ai_logic._call_gemini("Give feedback")
+
+    assert ai_logic.gemini_stats()["breaker_state"] == "open"
+    assert ai_logic.gemini_stats()["breaker_trips"] == 2
+
+
+def test_concurrency_limit(ai_logic, fake, monkeypatch):
+    monkeypatch.setattr(ai_logic, "_limiter", threading.BoundedSemaphore(2))
+    fake(latency=0.2)
+    peak = []
+    done = threading.Event()
+
+    def watch():
+        while not done.is_set():
+            peak.append(ai_logic.gemini_stats()["in_flight"])
+            time.sleep(0.005)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    start = time.monotonic()
+    threads = [
+        threading.Thread(target=ai_logic._call_gemini, args=("Give feedback",))
+        for _ in range(6)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - start
+    done.set()
+    watcher.join()
+
+    # 6 requests of 0.2 s, two at a time
+    assert elapsed >= 0.55
+    assert max(peak) == 2
+    stats = ai_logic.gemini_stats()
+    assert stats["requests"] == 6
+    assert stats["in_flight"] == 0
@@ -0,0 +1,140 @@
+import os
+import re
+from collections import Counter
+from pathlib import Path
+from typing import List
+
+from cache import DiskStore, MemoryLRU, content_key
+
+# Bump when the profile format changes so old cache entries are ignored
+PROFILE_VERSION = "1"
+PROFILE_CACHE_DIR = Path(os.environ.get("PROFILE_CACHE_DIR", ".profile_cache"))
+
+_memory = MemoryLRU(4 * 1024 * 1024)
+_disk = DiskStore(PROFILE_CACHE_DIR, suffix=".txt")
+
+SKILLS = {
+    "python", "java", "javascript", "typescript", "c++", "c#", "golang", "rust",
+    "ruby", "php", "kotlin", "swift", "scala", "sql", "nosql", "html", "css",
+    "react", "angular", "vue", "node", "django", "flask", "fastapi", "spring",
+    "streamlit", "pandas", "numpy", "pytorch", "tensorflow", "scikit-learn",
+    "machine learning", "deep learning", "nlp", "data analysis", "statistics",
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "linux", "git",
+    "ci/cd", "rest", "graphql", "microservices", "postgresql", "mysql", "mongodb",
+    "redis", "kafka", "spark", "airflow", "tableau", "power bi", "excel", "agile",
+    "scrum", "jira", "testing", "unit testing", "leadership", "communication",
+    "teamwork", "project management", "mentoring", "problem solving",
+}
+
+_ROLE_WORDS = (
+    "engineer", "developer", "manager", "analyst", "scientist", "intern",
+    "lead", "architect", "consultant", "designer", "administrator", "specialist",
+)
+
+_STOPWORDS = {
+    "the", "and", "for", "with", "you", "your", "our", "are", "will", "have",
+    "has", "this", "that", "from", "into", "who", "what", "all", "any", "can",
+    "able", "work", "working", "using", "used", "use", "including", "experience",
+    "years", "year", "team", "strong", "skills", "ability", "etc", "also",
+    "such", "other", "more", "must", "should", "well", "new", "job", "role",
+}
+
+MAX_ROLES = 5
+MAX_KEYWORDS = 15
+MAX_HIGHLIGHTS = 6
+HIGHLIGHT_CHARS = 140
+
+
+def _clean_lines(text: str) -> List[str]:
+    """Whitespace-normalized, non-empty lines with exact repeats removed."""
+    seen = set()
+    lines = []
+    for raw in text.splitlines():
+        line = " ".join(raw.strip(" \t•*-–·").split())
+        key = line.lower()
+        if len(line) < 3 or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return lines
+
+
+def _find_skills(lower: str) -> List[str]:
+    found = []
+    for skill in sorted(SKILLS):
+        if re.search(rf"(?<![\w+#]){re.escape(skill)}(?![\w+#])", lower):
+            found.append(skill)
+    return found
+
+
+def _build(text: str, kind: str) -> str:
+    lines = _clean_lines(text)
+    lower = "\n".join(lines).lower()
+
+    skills = _find_skills(lower)
+    roles = [
+        line for line in lines
+        if len(line) <= 80 and any(word in line.lower() for word in _ROLE_WORDS)
+    ][:MAX_ROLES]
+    words = [
+        w for w in re.findall(r"[a-z][a-z+#.]{2,}", lower)
+        if w not in _STOPWORDS and w not in SKILLS
+    ]
+    keywords = [w for w, _ in Counter(words).most_common(MAX_KEYWORDS)]
+    years = sorted({int(y) for y in re.findall(r"(\d{1,2})\+?\s+years?", lower)}, reverse=True)
+    highlights = [
+        line[:HIGHLIGHT_CHARS] for line in lines
+        if len(line) > 40 and line not in roles
+    ][:MAX_HIGHLIGHTS]
+
+    parts = [f"({kind})"]
+    if skills:
+        parts.append("Skills: " + ", ".join(skills))
+    if roles:
+        parts.append("Roles: " + " | ".join(roles))
+    if years:
+        parts.append(f"Experience mentioned: {years[0]}+ years")
+    if keywords:
+        parts.append("Keywords: " + ", ".join(keywords))
+    if highlights:
+        parts.append("Highlights:\n" + "\n".join(f"- {h}" for h in highlights))
+    return "\n".join(parts)
+
+
+def build_profile(text: str, kind: str = "resume") -> str:
+    """
+    Compact structured profile (skills, roles, keywords, highlights) of a
+    pasted resume or job description.
+
+    Computed once per unique text and cached in memory and on disk, so every
+    question of every session reuses it instead of the raw text.
+    """
+    if not text or not text.strip():
+        return ""
+
+    key = content_key("profile", PROFILE_VERSION, kind, text)
+    cached = _memory.get(key)
+    if cached is None:
+        cached = _disk.get(key)
+        if cached is not None:
+            _memory.put(key, cached)
+    if cached is not None:
+        return cached.decode("utf-8")
+
+    profile = _build(text, kind)
+    data = profile.encode("utf-8")
+    _memory.put(key, data)
+    _disk.put(key, data)
+    return profile
+
+
+def profile_cache_stats() -> dict:
+    """Hit/miss counters of the profile cache."""
+    memory = _memory.stats()
+    disk = _disk.stats()
+    return {
+        "memory_hits": memory["hits"],
+        "disk_hits": disk["hits"],
+        "misses": disk["misses"],
+        "entries": memory["entries"],
+    }